@@ -1,36 +1,108 @@
+import contextvars
 import json
-from typing import Dict, List, TypedDict, Annotated
-from langgraph.graph import StateGraph, END
+import re
+import threading
+from concurrent import futures
+from typing import Callable, Dict, List, Optional, TypedDict, Annotated
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import StateGraph, START, END
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from langchain.schema import HumanMessage, SystemMessage
 
+from cache import TTLCache, normalize_query
 from config import config
+from session import create_checkpointer
+from tracing import span, traced
+
+
+# Prefixes that mark a query as a refinement of the previous turn
+REFINEMENT_MARKERS = (
+    "换成", "换个", "换为", "改成", "改为", "调成", "变成",
+    "再", "还要", "加上", "加点", "去掉", "不要", "更",
+)
+
+# Tag dictionary shared by deterministic matching and local refinement merges
+TAG_VOCAB = {
+    "color": ["蓝色", "红色", "绿色", "黄色", "橙色", "紫色", "粉色", "金色", "黑色", "白色", "灰色",
+              "暖色", "冷色", "黑白", "渐变", "深色", "浅色", "亮色"],
+    "style": ["简约", "极简", "科技", "温馨", "商务", "现代", "复古", "可爱", "活泼", "清新",
+              "高端", "扁平化", "国潮", "卡通", "潮流"],
+    "scenario": ["发布会", "促销", "节日", "招聘", "社交媒体", "周年庆", "年会", "活动", "新品"],
+    "event": ["双十一", "双11", "618", "春节", "中秋", "圣诞", "情人节", "黑五"],
+    "industry": ["电商", "企业", "SaaS", "教育", "医疗", "餐饮", "金融", "地产"],
+    "use_case": ["宣传", "展示", "汇报", "推广", "营销", "引导"],
+}
+
+# Template types recognized in a query, mapped to the intent they imply
+TEMPLATE_TYPES = {
+    "海报": "生成海报", "名片": "制作名片", "PPT": "设计PPT", "演示": "设计PPT",
+    "封面": "设计封面", "长图": "设计长图", "落地页": "设计网页", "官网": "设计网页",
+    "网页": "设计网页", "邀请函": "制作邀请函", "启动页": "设计APP页面", "主图": "设计商品主图",
+    "详情页": "设计商品详情页", "报告": "设计报告", "图表": "设计图表",
+}
+
+# Filler words ignored when judging how much of a query the dictionary explains
+QUERY_FILLERS = ("给我", "帮我", "我要", "我想", "想要", "需要", "一个", "一张", "一份", "一款",
+                 "设计", "模板", "模版", "风格", "的", "做", "找", "个", "张", "份", "款", "要")
 
 
 class AgentState(TypedDict):
     """State for the agent graph"""
     query: str
     user_id: str
+    session_id: str
+    context: List[str]
     intent: str
     features: Dict[str, str]
     keywords: List[str]
     tags: List[str]
     search_strategy: str
     error: str
+    # Per-turn branch outputs, joined by merge_intent
+    det_keywords: List[str]
+    det_intent: Dict
+    llm_intent: Dict
+    embedding_prefetched: bool
+
+
+class DictionaryMatch:
+    """Run-scoped tag dictionary match, computed once and shared by parallel branches.
+    
+    The LLM branch reads it before calling the model, so a query the dictionary
+    fully explains never starts an LLM request.
+    """
+    
+    def __init__(self, match: Callable[[str], Dict]):
+        self._match = match
+        self._lock = threading.Lock()
+        self._result = None
+    
+    def get(self, query: str) -> Dict:
+        with self._lock:
+            if self._result is None:
+                self._result = self._match(query)
+            return self._result
 
 
 class TemplateAgent:
     """Template recommendation agent using LangGraph"""
     
-    def __init__(self):
+    def __init__(self, embedding_service=None):
+        # Optional: lets the graph prefetch query embeddings into the shared cache
+        self.embedding_service = embedding_service
+        
+        # Abandoned calls must end: cap each request at the LLM deadline
+        client_limits = {"timeout": config.llm_deadline_ms / 1000.0, "max_retries": config.llm_max_retries}
+        
         # Configure LLM based on provider
         if config.llm_provider == "anthropic":
             from langchain_anthropic import ChatAnthropic
             self.llm = ChatAnthropic(
                 model=config.llm_model,
                 temperature=0.3,
-                api_key=config.anthropic_api_key or config.llm_api_key
+                api_key=config.anthropic_api_key or config.llm_api_key,
+                **client_limits
             )
         elif config.llm_provider == "zhipu":
             # Us Zhipu's OpenAI-compatible endpoint
@@ -38,7 +110,8 @@ class TemplateAgent:
                 model=config.llm_model,
                 temperature=0.3,
                 api_key=config.zhipu_api_key or config.llm_api_key,
-                base_url="https://open.bigmodel.cn/api/paas/v4/"
+                base_url="https://open.bigmodel.cn/api/paas/v4/",
+                **client_limits
             )
         elif config.llm_provider == "qwen":
             # Use Qwen's (DashScope) OpenAI-compatible endpoint
@@ -46,7 +119,8 @@ class TemplateAgent:
                 model=config.llm_model,
                 temperature=0.3,
                 api_key=config.dashscope_api_key or config.llm_api_key,
-                base_url="https://dashscope.aliyuncs.com/compatible-mode/v1"
+                base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
+                **client_limits
             )
         else:
             # Default to OpenAI (works for OpenAI and OpenAI-compatible APIs)
@@ -54,14 +128,35 @@ class TemplateAgent:
                 model=config.llm_model,
                 temperature=0.3,
                 api_key=config.llm_api_key,
-                base_url=config.llm_api_base if config.llm_api_base else None
+                base_url=config.llm_api_base if config.llm_api_base else None,
+                **client_limits
             )
         
         self.intent_prompt = self._create_intent_prompt()
+        self.refine_prompt = self._create_refine_prompt()
         self.explanation_prompt = self._create_explanation_prompt()
         
-        # Build the agent graph
+        # Network-bound work gets its own bounded pools: LLM calls are abandoned at a deadline,
+        # embedding prefetches are fire-and-forget and dropped when the backlog is full
+        self.llm_executor = futures.ThreadPoolExecutor(
+            max_workers=config.llm_workers,
+            thread_name_prefix="agent-llm"
+        )
+        self.embedding_executor = futures.ThreadPoolExecutor(
+            max_workers=config.embedding_workers,
+            thread_name_prefix="agent-embedding"
+        )
+        self.embedding_backlog = threading.BoundedSemaphore(config.embedding_workers * 2)
+        self.llm_deadline = config.llm_deadline_ms / 1000.0
+        
+        # Stateless results are cached by normalized query (pre-filled by the warm-up job)
+        self.intent_cache = TTLCache(config.cache_max_entries, config.cache_ttl_seconds)
+        self.explanation_cache = TTLCache(config.cache_max_entries, config.cache_ttl_seconds)
+        
+        # Build the agent graph; sessions resume from the checkpointer
+        self.checkpointer = create_checkpointer()
         self.graph = self._build_graph()
+        self.session_graph = self._build_graph(self.checkpointer) if self.checkpointer else None
     
     def _create_intent_prompt(self) -> ChatPromptTemplate:
         """Create prompt for intent understanding"""
@@ -126,6 +221,17 @@ class TemplateAgent:
             ("user", "{query}")
         ])
     
+    def _create_refine_prompt(self) -> ChatPromptTemplate:
+        """Create delta prompt for refining the previous turn's intent"""
+        return ChatPromptTemplate.from_messages([
+            ("system", """你是一个设计模版意图理解助手,正在多轮对话中修改已有的检索意图。
+根据上一轮意图JSON和用户的新要求,输出修改后的完整意图JSON,字段与上一轮相同
+(intent, features, keywords, tags, search_strategy)。
+只修改新要求涉及的部分,其余保持不变。返回JSON格式,不要包含其他文字。"""),
+            ("user", """上一轮意图: {previous}
+{context}新要求: {query}""")
+        ])
+    
     def _create_explanation_prompt(self) -> ChatPromptTemplate:
         """Create prompt for explanation generation"""
         return ChatPromptTemplate.from_messages([
@@ -145,82 +251,311 @@ class TemplateAgent:
 请生成推荐说明:""")
         ])
     
-    def _build_graph(self):
-        """Build the LangGraph agent workflow"""
+    def _build_graph(self, checkpointer=None):
+        """Build the LangGraph agent workflow.
+        
+        New queries fan out to cheap deterministic branches (keywords, tag
+        dictionary, embedding prefetch) and the LLM branch in parallel; the LLM
+        branch is skipped when the dictionary fully explains the query. Session
+        refinements only need the LLM node. Everything joins in merge_intent.
+        """
         workflow = StateGraph(AgentState)
         
         # Add nodes
-        workflow.add_node("understand_intent", self._understand_intent_node)
-        workflow.add_node("extract_features", self._extract_features_node)
+        branches = ["extract_keywords", "match_tags", "understand_intent"]
+        workflow.add_node("extract_keywords", traced("node.extract_keywords")(self._extract_keywords_node))
+        workflow.add_node("match_tags", traced("node.match_tags")(self._match_tags_node))
+        workflow.add_node("understand_intent", traced("node.understand_intent")(self._understand_intent_node))
+        if self.embedding_service is not None:
+            branches.append("embed_query")
+            workflow.add_node("embed_query", traced("node.embed_query")(self._embed_query_node))
+        workflow.add_node("merge_intent", traced("node.merge_intent")(self._merge_intent_node))
         
         # Define edges
-        workflow.set_entry_point("understand_intent")
-        workflow.add_edge("understand_intent", "extract_features")
-        workflow.add_edge("extract_features", END)
+        workflow.add_conditional_edges(START, self._route_branches, branches)
+        for branch in branches:
+            workflow.add_edge(branch, "merge_intent")
+        workflow.add_edge("merge_intent", END)
         
-        return workflow.compile()
+        return workflow.compile(checkpointer=checkpointer)
+    
+    def _route_branches(self, state: AgentState) -> List[str]:
+        """Pick the branches to run for this turn"""
+        if self._previous_intent(state) and self._is_refinement(state["query"], state.get("context") or []):
+            return ["understand_intent"]
+        branches = ["extract_keywords", "match_tags", "understand_intent"]
+        if self.embedding_service is not None:
+            branches.append("embed_query")
+        return branches
+    
+    def _dictionary_match(self, state: AgentState, config: RunnableConfig) -> Dict:
+        """Dictionary match for this run, shared between branches when available"""
+        shared = config["configurable"].get("dictionary_match")
+        if shared is None:
+            return self._match_tags(state["query"])
+        return shared.get(state["query"])
+    
+    def _extract_keywords_node(self, state: AgentState) -> Dict:
+        """Branch: dictionary terms plus the leftover query segments"""
+        return {"det_keywords": self._extract_keywords(state["query"])}
+    
+    def _match_tags_node(self, state: AgentState, config: RunnableConfig) -> Dict:
+        """Branch: tag dictionary matching"""
+        return {"det_intent": self._dictionary_match(state, config)}
+    
+    def _embed_query_node(self, state: AgentState) -> Dict:
+        """Branch: start warming the embedding cache for the follow-up GenerateEmbedding call.
+        
+        Fire-and-forget so the join never waits on it; skipped when the backlog is full.
+        """
+        if not self.embedding_backlog.acquire(blocking=False):
+            return {"embedding_prefetched": False}
+        future = self.embedding_executor.submit(
+            contextvars.copy_context().run, self.embedding_service.encode, state["query"]
+        )
+        future.add_done_callback(lambda _: self.embedding_backlog.release())
+        return {"embedding_prefetched": True}
     
-    def _understand_intent_node(self, state: AgentState) -> AgentState:
-        """Node to understand user intent"""
+    def _understand_intent_node(self, state: AgentState, config: RunnableConfig) -> Dict:
+        """Branch: LLM intent understanding, skipped when the dictionary is confident"""
+        query = state["query"]
+        context = state.get("context") or []
+        previous = self._previous_intent(state)
+        
+        if previous and self._is_refinement(query, context):
+            # Follow-up turn: merge locally if possible, else send a delta prompt
+            result = self._merge_refinement(previous, query)
+            if result is not None:
+                return {"llm_intent": result}
+            context_text = "".join(f"对话上下文: {c}\n" for c in context)
+            work = lambda: self._call_llm_json(
+                self.refine_prompt,
+                previous=json.dumps(previous, ensure_ascii=False),
+                context=context_text,
+                query=query
+            )
+        elif not context and self._dictionary_match(state, config).get("confident"):
+            # The dictionary fully explains the query; skip the model
+            return {"llm_intent": {}}
+        else:
+            if context:
+                query = "\n".join(context + [query])
+            work = lambda: self._call_llm_json(self.intent_prompt, query=query)
+        
+        future = self.llm_executor.submit(contextvars.copy_context().run, work)
         try:
-            query = state["query"]
-            
-            # Call LLM to understand intent
-            messages = self.intent_prompt.format_messages(query=query)
-            response = self.llm.invoke(messages)
-            
-            # Parse JSON response
-            result = json.loads(response.content)
-            
-            # Update state
-            state["intent"] = result.get("intent", "模版推荐")
-            state["features"] = result.get("features", {})
-            state["keywords"] = result.get("keywords", [])
-            state["tags"] = result.get("tags", [])
-            state["search_strategy"] = result.get("search_strategy", "hybrid")
-            
+            return {"llm_intent": future.result(timeout=self.llm_deadline)}
+        except futures.TimeoutError:
+            # Still queued calls never start; running ones end at the client timeout
+            future.cancel()
+            return {"llm_intent": {}, "error": "LLM deadline exceeded"}
         except Exception as e:
-            # Fallback on error
-            state["error"] = str(e)
-            state["intent"] = "模版推荐"
-            state["features"] = {}
-            state["keywords"] = state["query"].split()
-            state["tags"] = []
-            state["search_strategy"] = "vector"
-        
-        return state
-    
-    def _extract_features_node(self, state: AgentState) -> AgentState:
-        """Node to extract additional features if needed"""
-        # Additional feature extraction logic can be added here
-        return state
-    
-    def understand_intent(self, query: str, user_id: str = None, context: List[str] = None) -> Dict:
+            return {"llm_intent": {}, "error": str(e)}
+    
+    def _merge_intent_node(self, state: AgentState) -> Dict:
+        """Join: prefer the LLM intent, else the confident dictionary intent, else a fallback"""
+        llm_intent = state.get("llm_intent") or {}
+        det_intent = state.get("det_intent") or {}
+        det_keywords = state.get("det_keywords") or []
+        
+        if llm_intent:
+            return {
+                "intent": llm_intent.get("intent", "模版推荐"),
+                "features": llm_intent.get("features", {}),
+                "keywords": self._union(llm_intent.get("keywords", []), det_keywords),
+                "tags": self._union(llm_intent.get("tags", []), det_intent.get("tags", [])),
+                "search_strategy": llm_intent.get("search_strategy", "hybrid")
+            }
+        
+        if det_intent.get("confident"):
+            return {
+                "intent": det_intent["intent"],
+                "features": det_intent["features"],
+                "keywords": det_keywords or det_intent["tags"],
+                "tags": det_intent["tags"],
+                "search_strategy": det_intent["search_strategy"],
+                "error": ""
+            }
+        
+        # A failed refinement keeps the session's previous intent intact
+        previous = self._previous_intent(state)
+        if previous and self._is_refinement(state["query"], state.get("context") or []):
+            return {**previous, "error": state.get("error") or "intent refinement failed"}
+        
+        # Fallback on error: keep whatever the dictionary found
+        return {
+            "intent": det_intent.get("intent") or "模版推荐",
+            "features": det_intent.get("features", {}),
+            "keywords": det_keywords or state["query"].split(),
+            "tags": det_intent.get("tags", []),
+            "search_strategy": "vector",
+            "error": state.get("error") or "intent understanding failed"
+        }
+    
+    def _call_llm_json(self, prompt: ChatPromptTemplate, **variables) -> Dict:
+        """Call the LLM and parse its JSON answer"""
+        content = self._call_llm(prompt, **variables)
+        with span("llm.parse_json"):
+            return json.loads(content)
+    
+    def _call_llm(self, prompt: ChatPromptTemplate, **variables) -> str:
+        """Format the prompt and call the LLM, tracing each phase"""
+        with span("llm.prompt_format"):
+            messages = prompt.format_messages(**variables)
+        with span("llm.invoke", provider=config.llm_provider, model=config.llm_model):
+            return self.llm.invoke(messages).content
+    
+    def _previous_intent(self, state: AgentState) -> Optional[Dict]:
+        """Intent restored from the session checkpoint, if any"""
+        if not state.get("intent"):
+            return None
+        return {
+            "intent": state["intent"],
+            "features": state.get("features", {}),
+            "keywords": state.get("keywords", []),
+            "tags": state.get("tags", []),
+            "search_strategy": state.get("search_strategy", "hybrid")
+        }
+    
+    def _is_refinement(self, query: str, context: List[str]) -> bool:
+        """Whether the query modifies the previous intent rather than starting over"""
+        return bool(context) or query.strip().startswith(REFINEMENT_MARKERS)
+    
+    def _merge_refinement(self, previous: Dict, query: str) -> Optional[Dict]:
+        """Apply simple attribute swaps/removals without calling the LLM.
+        
+        Returns None when the refinement is not understood locally.
+        """
+        match = re.match(r"^(换成|换为|改成|改为|调成|变成|去掉|不要)(.+?)的?(风格|色调)?[的吧。!！]*$", query.strip())
+        if not match:
+            return None
+        
+        action, term = match.group(1), match.group(2)
+        category = None
+        for name, values in TAG_VOCAB.items():
+            if term in values:
+                category = name
+            elif term + "色" in values:
+                category, term = name, term + "色"
+        if category is None:
+            return None
+        
+        # Removals drop only the term; swaps replace every value of its category
+        removed = [term] if action in ("去掉", "不要") else TAG_VOCAB[category]
+        result = json.loads(json.dumps(previous))
+        result["tags"] = [t for t in result["tags"] if t not in removed]
+        result["keywords"] = [k for k in result["keywords"] if k not in removed]
+        features = {k: "、".join(p for p in str(v).split("、") if p not in removed)
+                    for k, v in result["features"].items()}
+        result["features"] = {k: v for k, v in features.items() if v}
+        
+        if action in ("去掉", "不要"):
+            return result
+        
+        result["tags"].append(term)
+        result["keywords"].append(term)
+        result["features"][category] = term
+        if result["search_strategy"] == "vector":
+            result["search_strategy"] = "hybrid"
+        return result
+    
+    def _match_tags(self, query: str) -> Dict:
+        """Deterministic intent from the tag dictionary.
+        
+        Confident when a template type and at least one attribute are found and
+        the dictionary explains the whole query apart from filler words.
+        """
+        features: Dict[str, str] = {}
+        tags: List[str] = []
+        for category, values in TAG_VOCAB.items():
+            found = [v for v in values if v in query]
+            if found:
+                features[category] = "、".join(found)
+                tags.extend(found)
+        
+        template_type = next((t for t in TEMPLATE_TYPES if t in query), None)
+        if template_type:
+            tags.append(template_type)
+        
+        residual = self._strip_terms(query, tags + list(QUERY_FILLERS))
+        return {
+            "intent": TEMPLATE_TYPES[template_type] if template_type else "",
+            "features": features,
+            "tags": tags,
+            "search_strategy": "hybrid",
+            "confident": bool(template_type and features and len(residual) <= 1)
+        }
+    
+    def _extract_keywords(self, query: str) -> List[str]:
+        """Dictionary terms found in the query plus the remaining multi-character segments"""
+        terms = [v for values in TAG_VOCAB.values() for v in values if v in query]
+        terms += [t for t in TEMPLATE_TYPES if t in query]
+        segments = re.split(r"[\s,，。.!！?？、]+", self._strip_terms(query, terms + list(QUERY_FILLERS), " "))
+        return self._union(terms, [s for s in segments if len(s) >= 2])
+    
+    def _strip_terms(self, query: str, terms: List[str], replacement: str = "") -> str:
+        """Remove terms (longest first) and punctuation from the query"""
+        for term in sorted(set(terms), key=len, reverse=True):
+            query = query.replace(term, replacement)
+        if replacement:
+            return query.strip()
+        return re.sub(r"[\s,，。.!！?？、]+", "", query)
+    
+    def _union(self, first: List[str], second: List[str]) -> List[str]:
+        """Order-preserving union of two lists"""
+        return list(dict.fromkeys(list(first) + list(second)))
+    
+    def understand_intent(self, query: str, user_id: str = None, context: List[str] = None,
+                          session_id: str = None) -> Dict:
         """Main entry point for intent understanding"""
-        initial_state = AgentState(
-            query=query,
-            user_id=user_id or "",
-            intent="",
-            features={},
-            keywords=[],
-            tags=[],
-            search_strategy="",
-            error=""
-        )
+        # Single-shot queries are answered from the cache when possible
+        cacheable = not session_id and not context
+        if cacheable:
+            cached = self.intent_cache.get(normalize_query(query))
+            if cached is not None:
+                return cached
+        
+        # Only per-turn inputs; the previous intent is restored from the session checkpoint
+        turn_input = {
+            "query": query,
+            "user_id": user_id or "",
+            "session_id": session_id or "",
+            "context": context or [],
+            "error": "",
+            "det_keywords": [],
+            "det_intent": {},
+            "llm_intent": {},
+            "embedding_prefetched": False
+        }
+        run_config = {"configurable": {"dictionary_match": DictionaryMatch(self._match_tags)}}
         
         # Run the graph
-        final_state = self.graph.invoke(initial_state)
+        with span("graph.invoke", session=bool(session_id)):
+            if session_id and self.session_graph:
+                # Scope sessions to the caller so a guessed session id cannot read another user's state
+                run_config["configurable"]["thread_id"] = f"{user_id or ''}:{session_id}"
+                final_state = self.session_graph.invoke(turn_input, config=run_config)
+            else:
+                final_state = self.graph.invoke(turn_input, config=run_config)
         
-        return {
+        result = {
             "intent": final_state["intent"],
             "features": final_state["features"],
             "keywords": final_state["keywords"],
             "tags": final_state["tags"],
             "search_strategy": final_state["search_strategy"]
         }
+        if cacheable and not final_state.get("error"):
+            self.intent_cache.set(normalize_query(query), result)
+        return result
     
     def generate_explanation(self, query: str, templates: List[Dict]) -> str:
         """Generate recommendation explanation"""
+        cache_key = (normalize_query(query), tuple(t.get('template_id', t['name']) for t in templates))
+        cached = self.explanation_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             # Format templates
             templates_text = "\n".join([
@@ -228,13 +563,14 @@ class TemplateAgent:
                 for i, t in enumerate(templates[:5])
             ])
             
-            messages = self.explanation_prompt.format_messages(
+            explanation = self._call_llm(
+                self.explanation_prompt,
                 query=query,
                 templates=templates_text
             )
-            response = self.llm.invoke(messages)
             
-            return response.content
+            self.explanation_cache.set(cache_key, explanation)
+            return explanation
         except Exception as e:
             # Fallback
             return f"为您推荐以下{len(templates)}个模版"
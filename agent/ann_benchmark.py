@@ -0,0 +1,336 @@
+"""Offline recall-vs-latency benchmark for the Milvus indexes.
+
+Builds a labeled query -> template set from the template catalog, computes
+exact top-k ground truth by brute force, then sweeps index type, HNSW/IVF
+parameters, vector dimension and precision on a scratch Milvus collection.
+For every configuration it reports recall@k against the exact results, label
+hit@k, search latency percentiles and estimated index memory. It also reports
+hit and false-hit rates of the semantic query cache for a range of squared-L2
+thresholds, the scale of Milvus L2 scores and of the Go cache threshold. Example::
+
+    python ann_benchmark.py --k 10 --synthetic 20000 --hnsw-m 8,16,32 --ef 16,32,64,100
+"""
+import argparse
+import json
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+CATALOG_SQL = """
+SELECT template_id, name, description, category, style, color_scheme, use_case, tags
+FROM templates
+WHERE status = 'active'
+ORDER BY template_id
+"""
+
+BYTES_PER_DIM = {"float32": 4, "float16": 2}
+
+
+def load_catalog(conn) -> List[Dict]:
+    """Load active templates from PostgreSQL"""
+    columns = ["template_id", "name", "description", "category", "style", "color_scheme", "use_case", "tags"]
+    with conn.cursor() as cur:
+        cur.execute(CATALOG_SQL)
+        return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+
+def template_text(t: Dict) -> str:
+    """Document text, same format as the Go seeder uses for the templates collection"""
+    return "%s。%s。分类：%s。风格：%s。色调：%s。用途：%s。标签：%s" % (
+        t["name"], t["description"] or "", t["category"] or "", t["style"] or "",
+        t["color_scheme"] or "", t["use_case"] or "", "、".join(t["tags"] or []),
+    )
+
+
+def labeled_queries(catalog: List[Dict]) -> List[Tuple[str, str]]:
+    """Derive (query, template_id) pairs from catalog fields"""
+    pairs = []
+    for t in catalog:
+        candidates = [t["name"], t["description"]]
+        if t["style"] and t["category"]:
+            candidates.append(f"{t['style']}的{t['category']}模板")
+        if t["use_case"] and t["category"]:
+            candidates.append(f"{t['use_case']}用的{t['category']}")
+        if t["tags"]:
+            candidates.append("、".join(t["tags"]) + "风格设计")
+        seen = set()
+        for q in candidates:
+            if q and q not in seen:
+                seen.add(q)
+                pairs.append((q, t["template_id"]))
+    return pairs
+
+
+def synthetic_distractors(vectors: np.ndarray, count: int, seed: int = 0) -> np.ndarray:
+    """Pad the corpus with noisy mixtures of real vectors so ANN recall is measured at scale"""
+    rng = np.random.default_rng(seed)
+    a = vectors[rng.integers(0, len(vectors), count)]
+    b = vectors[rng.integers(0, len(vectors), count)]
+    mix = rng.uniform(0.2, 0.8, (count, 1)).astype(np.float32)
+    noise = rng.normal(0, 0.3 / np.sqrt(vectors.shape[1]), (count, vectors.shape[1])).astype(np.float32)
+    out = mix * a + (1 - mix) * b + noise
+    scale = np.linalg.norm(vectors, axis=1).mean()
+    return out / np.linalg.norm(out, axis=1, keepdims=True) * scale
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Brute-force L2 top-k indices, the ground truth for recall"""
+    distances = (
+        (queries ** 2).sum(axis=1, keepdims=True)
+        - 2 * queries @ corpus.T
+        + (corpus ** 2).sum(axis=1)
+    )
+    top = np.argpartition(distances, min(k, corpus.shape[0] - 1), axis=1)[:, :k]
+    order = np.take_along_axis(distances, top, axis=1).argsort(axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+def reduce_vectors(vectors: np.ndarray, dim: Optional[int], precision: str) -> np.ndarray:
+    """Truncate to the leading dimensions (re-normalized) and cast to the storage precision"""
+    if dim and dim < vectors.shape[1]:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors[:, :dim]
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12) * norms
+    return vectors.astype(np.float16 if precision == "float16" else np.float32)
+
+
+def estimate_memory(index_type: str, params: Dict, n: int, dim: int, precision: str) -> int:
+    """Approximate resident bytes of the index"""
+    raw = n * dim * BYTES_PER_DIM[precision]
+    if index_type == "HNSW":
+        # Level-0 graph keeps 2*M neighbor ids per node; upper levels add ~1/M on top
+        return raw + int(n * params["M"] * 2 * 4 * (1 + 1 / params["M"]))
+    if index_type == "IVF_FLAT":
+        return raw + params["nlist"] * dim * 4 + n * 8
+    if index_type == "IVF_SQ8":
+        return n * dim + params["nlist"] * dim * 4 + n * 8
+    return raw
+
+
+def index_configs(args) -> List[Tuple[str, Dict, List[Dict]]]:
+    """(index_type, build params, search params to sweep) combinations"""
+    configs = []
+    if "FLAT" in args.index_types:
+        configs.append(("FLAT", {}, [{}]))
+    for index_type in ("IVF_FLAT", "IVF_SQ8"):
+        if index_type in args.index_types:
+            for nlist in args.nlist:
+                configs.append((index_type, {"nlist": nlist}, [{"nprobe": p} for p in args.nprobe if p <= nlist]))
+    if "HNSW" in args.index_types:
+        for m in args.hnsw_m:
+            configs.append(("HNSW", {"M": m, "efConstruction": args.ef_construction},
+                            [{"ef": ef} for ef in args.ef if ef >= args.k]))
+    return configs
+
+
+def percentile_ms(samples: List[float], q: float) -> float:
+    return float(np.percentile(samples, q) * 1000)
+
+
+def run_sweep(client, corpus: np.ndarray, queries: np.ndarray, labels: List[int],
+              ground_truth: np.ndarray, args) -> List[Dict]:
+    """Build each index on a scratch collection and measure recall and latency"""
+    from pymilvus import DataType
+
+    results = []
+    for dim in args.dims:
+        for precision in args.precisions:
+            corpus_r = reduce_vectors(corpus, dim, precision)
+            queries_r = reduce_vectors(queries, dim, precision)
+            actual_dim = corpus_r.shape[1]
+            vector_type = DataType.FLOAT16_VECTOR if precision == "float16" else DataType.FLOAT_VECTOR
+
+            for index_type, build_params, search_sweep in index_configs(args):
+                name = f"{args.collection_prefix}{index_type.lower()}_{actual_dim}_{precision}"
+                if client.has_collection(name):
+                    client.drop_collection(name)
+
+                schema = client.create_schema(auto_id=False)
+                schema.add_field("id", DataType.INT64, is_primary=True)
+                schema.add_field("vector", vector_type, dim=actual_dim)
+                index_params = client.prepare_index_params()
+                index_params.add_index("vector", index_type=index_type, metric_type="L2", params=build_params)
+
+                try:
+                    start = time.perf_counter()
+                    client.create_collection(name, schema=schema)
+                    for i in range(0, len(corpus_r), 1000):
+                        client.insert(name, [
+                            {"id": i + j, "vector": v} for j, v in enumerate(corpus_r[i:i + 1000])
+                        ])
+                    client.flush(name)
+                    client.create_index(name, index_params)
+                    client.load_collection(name)
+                    build_seconds = time.perf_counter() - start
+
+                    for search_params in search_sweep:
+                        params = {"metric_type": "L2", "params": search_params}
+                        for q in queries_r[:10]:
+                            client.search(name, data=[q], limit=args.k, search_params=params)
+
+                        latencies, recalls, label_hits = [], [], []
+                        for qi, q in enumerate(queries_r):
+                            t0 = time.perf_counter()
+                            hits = client.search(name, data=[q], limit=args.k, search_params=params)[0]
+                            latencies.append(time.perf_counter() - t0)
+                            ids = {h["id"] for h in hits}
+                            recalls.append(len(ids & set(ground_truth[qi].tolist())) / args.k)
+                            label_hits.append(labels[qi] in ids)
+
+                        row = {
+                            "index": index_type,
+                            "build": build_params,
+                            "search": search_params,
+                            "dim": actual_dim,
+                            "precision": precision,
+                            f"recall@{args.k}": float(np.mean(recalls)),
+                            f"label_hit@{args.k}": float(np.mean(label_hits)),
+                            "p50_ms": percentile_ms(latencies, 50),
+                            "p95_ms": percentile_ms(latencies, 95),
+                            "p99_ms": percentile_ms(latencies, 99),
+                            "memory_mb": estimate_memory(index_type, build_params, len(corpus_r),
+                                                         actual_dim, precision) / 2 ** 20,
+                            "build_s": build_seconds,
+                        }
+                        results.append(row)
+                        logger.info(
+                            f"{index_type} {build_params} {search_params} dim={actual_dim} {precision}: "
+                            f"recall={row[f'recall@{args.k}']:.3f} p95={row['p95_ms']:.2f}ms "
+                            f"mem={row['memory_mb']:.1f}MB"
+                        )
+                finally:
+                    client.drop_collection(name)
+    return results
+
+
+def cache_threshold_report(queries: np.ndarray, labels: List[int], thresholds: List[float]) -> List[Dict]:
+    """Hit and false-hit rates of the semantic query cache at each squared-L2 threshold.
+
+    Every other query is treated as cached; a hit is the nearest one within the
+    threshold, and it is false when that query targets a different template.
+    Distances are squared like Milvus L2 scores, which the Go cache compares
+    with its threshold directly.
+    """
+    sq = (queries ** 2).sum(axis=1)
+    distances = np.maximum(sq[:, None] - 2 * queries @ queries.T + sq[None, :], 0)
+    np.fill_diagonal(distances, np.inf)
+    nearest = distances.argmin(axis=1)
+    nearest_distance = distances[np.arange(len(queries)), nearest]
+    wrong_label = np.asarray(labels)[nearest] != np.asarray(labels)
+
+    report = []
+    for t in thresholds:
+        hits = nearest_distance <= t
+        false_hits = hits & wrong_label
+        report.append({
+            "threshold": t,
+            "hit_rate": float(hits.mean()),
+            "false_hit_rate": float(false_hits.sum() / hits.sum()) if hits.any() else 0.0,
+        })
+    return report
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def _float_list(value: str) -> List[float]:
+    return [float(v) for v in value.split(",") if v]
+
+
+def _dim_list(value: str) -> List[Optional[int]]:
+    return [None if v == "full" else int(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding/ANN recall-vs-latency benchmark")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", help="JSONL file of {\"query\", \"template_id\"} to use instead of generated queries")
+    parser.add_argument("--synthetic", type=int, default=0, help="number of synthetic distractor vectors")
+    parser.add_argument("--index-types", default="FLAT,IVF_FLAT,HNSW", type=lambda v: v.split(","))
+    parser.add_argument("--hnsw-m", default="8,16,32", type=_int_list)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--ef", default="16,32,64,100,200", type=_int_list)
+    parser.add_argument("--nlist", default="16,128", type=_int_list)
+    parser.add_argument("--nprobe", default="4,16,64", type=_int_list)
+    parser.add_argument("--dims", default="full", type=_dim_list, help='e.g. "full,512,256"')
+    parser.add_argument("--precisions", default="float32,float16", type=lambda v: v.split(","))
+    parser.add_argument("--thresholds", default="0.05,0.1,0.15,0.2,0.3,0.4", type=_float_list,
+                        help="cache thresholds on Milvus's squared-L2 scale, as in the Go cache service")
+    parser.add_argument("--collection-prefix", default="bench_")
+    parser.add_argument("--output", help="write all results as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    from pymilvus import MilvusClient
+    from embedding import EmbeddingService
+    from warmup import connect_db
+
+    conn = connect_db()
+    try:
+        catalog = load_catalog(conn)
+    finally:
+        conn.close()
+
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            pairs = [(item["query"], item["template_id"]) for item in map(json.loads, f) if item]
+    else:
+        pairs = labeled_queries(catalog)
+    logger.info(f"{len(catalog)} templates, {len(pairs)} labeled queries")
+
+    embedding_service = EmbeddingService()
+    corpus = np.asarray(embedding_service.batch_encode([template_text(t) for t in catalog]), dtype=np.float32)
+    queries = np.asarray(embedding_service.batch_encode([q for q, _ in pairs]), dtype=np.float32)
+
+    # Drop pairs whose embedding failed (zero vectors)
+    position = {t["template_id"]: i for i, t in enumerate(catalog)}
+    keep = [i for i, (_, tid) in enumerate(pairs) if tid in position and queries[i].any()]
+    queries = queries[keep]
+    labels = [position[pairs[i][1]] for i in keep]
+
+    if args.synthetic:
+        corpus = np.vstack([corpus, synthetic_distractors(corpus, args.synthetic)])
+
+    ground_truth = exact_top_k(corpus, queries, args.k)
+    exact_label_hit = float(np.mean([labels[i] in ground_truth[i] for i in range(len(labels))]))
+    logger.info(f"Exact search label_hit@{args.k}: {exact_label_hit:.3f}")
+
+    client = MilvusClient(uri=f"http://{config.milvus_host}:{config.milvus_port}")
+    results = {
+        "corpus_size": int(len(corpus)),
+        "queries": len(labels),
+        "k": args.k,
+        f"exact_label_hit@{args.k}": exact_label_hit,
+        "indexes": run_sweep(client, corpus, queries, labels, ground_truth, args),
+        "cache_thresholds": cache_threshold_report(queries, labels, args.thresholds),
+    }
+
+    print(f"\n{'index':<9}{'build':<32}{'search':<16}{'dim':>6}{'prec':>9}"
+          f"{'recall':>8}{'label':>7}{'p50ms':>8}{'p95ms':>8}{'p99ms':>8}{'memMB':>9}")
+    for r in results["indexes"]:
+        print(f"{r['index']:<9}{json.dumps(r['build']):<32}{json.dumps(r['search']):<16}{r['dim']:>6}"
+              f"{r['precision']:>9}{r[f'recall@{args.k}']:>8.3f}{r[f'label_hit@{args.k}']:>7.3f}"
+              f"{r['p50_ms']:>8.2f}{r['p95_ms']:>8.2f}{r['p99_ms']:>8.2f}{r['memory_mb']:>9.1f}")
+
+    print(f"\n{'L2^2 threshold':<16}{'hit rate':>10}{'false hits':>12}")
+    for r in results["cache_thresholds"]:
+        print(f"{r['threshold']:<16}{r['hit_rate']:>10.3f}{r['false_hit_rate']:>12.3f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -35,6 +35,43 @@ class Config:
         self.milvus_host = os.getenv("MILVUS_HOST", "localhost")
         self.milvus_port = int(os.getenv("MILVUS_PORT", "19530"))
         
+        # Redis connection (shared with the Go backend)
+        self.redis_host = os.getenv("REDIS_HOST", "localhost")
+        self.redis_port = int(os.getenv("REDIS_PORT", "6379"))
+        self.redis_db = int(os.getenv("REDIS_DB", "0"))
+        self.redis_password = os.getenv("REDIS_PASSWORD", "")
+        
+        # Session state for multi-turn intent refinement
+        # memory: in-process TTL store, redis: shared across replicas, none: stateless
+        self.session_backend = os.getenv("SESSION_BACKEND", "memory").lower()
+        self.session_ttl_seconds = int(os.getenv("SESSION_TTL_SECONDS", "1800"))
+        
+        # PostgreSQL connection (read-only, used by the cache warm-up job)
+        self.db_host = os.getenv("DB_HOST", "localhost")
+        self.db_port = int(os.getenv("DB_PORT", "5432"))
+        self.db_user = os.getenv("DB_USER", "postgres")
+        self.db_password = os.getenv("DB_PASSWORD", "postgres")
+        self.db_name = os.getenv("DB_NAME", "templates")
+        
+        # In-process caches for intents, embeddings and explanations
+        self.cache_max_entries = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+        self.cache_ttl_seconds = int(os.getenv("CACHE_TTL_SECONDS", "21600"))
+        # Warm-up snapshot loaded at startup: "" (disabled), "redis", or a JSON file path
+        self.warmup_source = os.getenv("WARMUP_SOURCE", "")
+        
+        # Intent graph branches: LLM deadline and worker pool sizes
+        self.llm_deadline_ms = int(os.getenv("LLM_DEADLINE_MS", "15000"))
+        self.llm_max_retries = int(os.getenv("LLM_MAX_RETRIES", "1"))
+        self.llm_workers = int(os.getenv("LLM_WORKERS", "16"))
+        self.embedding_workers = int(os.getenv("EMBEDDING_WORKERS", "4"))
+        
+        # Observability
+        self.tracing_enabled = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+        self.tracing_service_name = os.getenv("TRACING_SERVICE_NAME", "agent-service")
+        # Admin Profile RPC samples the live process; keep it off unless needed
+        self.profiling_enabled = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+        self.profiling_max_seconds = int(os.getenv("PROFILING_MAX_SECONDS", "60"))
+        
         # gRPC server config
         self.grpc_port = int(os.getenv("GRPC_PORT", "50051"))
         
@@ -3,7 +3,9 @@ import numpy as np
 from typing import List, Union
 from sentence_transformers import SentenceTransformer
 
+from cache import TTLCache, normalize_query
 from config import config
+from tracing import traced
 
 
 class EmbeddingService:
@@ -11,6 +13,7 @@ class EmbeddingService:
     
     def __init__(self):
         self.use_local = config.use_local_embedding
+        self.cache = TTLCache(config.cache_max_entries, config.cache_ttl_seconds)
         
         if self.use_local:
             # Configure local embedding model
@@ -55,11 +58,23 @@ class EmbeddingService:
     
     def encode(self, text: Union[str, List[str]]) -> np.ndarray:
         """Encode text to embedding vector(s)"""
+        if isinstance(text, str):
+            key = normalize_query(text)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+            embedding = self._encode_local(text) if self.use_local else self._encode_api(text)
+            if np.any(embedding):
+                # Zero vectors are error fallbacks and must not be cached
+                self.cache.set(key, embedding)
+            return embedding
+        
         if self.use_local:
             return self._encode_local(text)
         else:
             return self._encode_api(text)
     
+    @traced("embedding.local")
     def _encode_local(self, text: Union[str, List[str]]) -> np.ndarray:
         """Encode using local model"""
         embeddings = self.model.encode(
@@ -70,6 +85,7 @@ class EmbeddingService:
         )
         return embeddings
     
+    @traced("embedding.api")
     def _encode_api(self, text: Union[str, List[str]]) -> np.ndarray:
         """Encode using API"""
         if isinstance(text, str):
@@ -0,0 +1,53 @@
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class SamplingProfiler:
+    """Wall-clock sampling profiler for the live process.
+
+    Periodically snapshots the stacks of all threads and aggregates them into
+    folded stacks ("frame;frame;frame count" per line), the input format of
+    flamegraph.pl and speedscope. Only one profile runs at a time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def profile(self, seconds: float, interval: float = 0.01) -> tuple:
+        """Sample for the given duration; returns (folded stacks, sample count).
+
+        Raises RuntimeError if another profile is already running.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("a profile is already running")
+        try:
+            return self._sample(seconds, interval)
+        finally:
+            self._lock.release()
+
+    def _sample(self, seconds: float, interval: float) -> tuple:
+        own_thread = threading.get_ident()
+        names = {}
+        stacks = Counter()
+        samples = 0
+
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names.update((t.ident, t.name) for t in threading.enumerate())
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                    frame = frame.f_back
+                frames.append(names.get(thread_id, str(thread_id)))
+                stacks[";".join(reversed(frames))] += 1
+            samples += 1
+            time.sleep(interval)
+
+        folded = "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+        return folded, samples
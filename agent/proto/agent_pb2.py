@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x11proto/agent.proto\x12\x05\x61gent\"@\n\rIntentRequest\x12\r\n\x05query\x18\x01 \x01(\t\x12\x0f\n\x07user_id\x18\x02 \x01(\t\x12\x0f\n\x07\x63ontext\x18\x03 \x03(\t\"\xc1\x01\n\x0eIntentResponse\x12\x0e\n\x06intent\x18\x01 \x01(\t\x12\x35\n\x08\x66\x65\x61tures\x18\x02 \x03(\x0b\x32#.agent.IntentResponse.FeaturesEntry\x12\x10\n\x08keywords\x18\x03 \x03(\t\x12\x0c\n\x04tags\x18\x04 \x03(\t\x12\x17\n\x0fsearch_strategy\x18\x05 \x01(\t\x1a/\n\rFeaturesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\" \n\x10\x45mbeddingRequest\x12\x0c\n\x04text\x18\x01 \x01(\t\"9\n\x11\x45mbeddingResponse\x12\x11\n\tembedding\x18\x01 \x03(\x02\x12\x11\n\tdimension\x18\x02 \x01(\x05\"P\n\x08Template\x12\x13\n\x0btemplate_id\x18\x01 \x01(\t\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x13\n\x0b\x64\x65scription\x18\x03 \x01(\t\x12\x0c\n\x04tags\x18\x04 \x03(\t\"G\n\x12\x45xplanationRequest\x12\r\n\x05query\x18\x01 \x01(\t\x12\"\n\ttemplates\x18\x02 \x03(\x0b\x32\x0f.agent.Template\";\n\x13\x45xplanationResponse\x12\x13\n\x0b\x65xplanation\x18\x01 \x01(\t\x12\x0f\n\x07reasons\x18\x02 \x03(\t2\xe2\x01\n\tAIService\x12?\n\x10UnderstandIntent\x12\x14.agent.IntentRequest\x1a\x15.agent.IntentResponse\x12\x46\n\x11GenerateEmbedding\x12\x17.agent.EmbeddingRequest\x1a\x18.agent.EmbeddingResponse\x12L\n\x13GenerateExplanation\x12\x19.agent.ExplanationRequest\x1a\x1a.agent.ExplanationResponseB\x1aZ\x18template-recommend/protob\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x11proto/agent.proto\x12\x05\x61gent\"T\n\rIntentRequest\x12\r\n\x05query\x18\x01 \x01(\t\x12\x0f\n\x07user_id\x18\x02 \x01(\t\x12\x0f\n\x07\x63ontext\x18\x03 \x03(\t\x12\x12\n\nsession_id\x18\x04 \x01(\t\"\xc1\x01\n\x0eIntentResponse\x12\x0e\n\x06intent\x18\x01 \x01(\t\x12\x35\n\x08\x66\x65\x61tures\x18\x02 \x03(\x0b\x32#.agent.IntentResponse.FeaturesEntry\x12\x10\n\x08keywords\x18\x03 \x03(\t\x12\x0c\n\x04tags\x18\x04 \x03(\t\x12\x17\n\x0fsearch_strategy\x18\x05 \x01(\t\x1a/\n\rFeaturesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\" \n\x10\x45mbeddingRequest\x12\x0c\n\x04text\x18\x01 \x01(\t\"9\n\x11\x45mbeddingResponse\x12\x11\n\tembedding\x18\x01 \x03(\x02\x12\x11\n\tdimension\x18\x02 \x01(\x05\"P\n\x08Template\x12\x13\n\x0btemplate_id\x18\x01 \x01(\t\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x13\n\x0b\x64\x65scription\x18\x03 \x01(\t\x12\x0c\n\x04tags\x18\x04 \x03(\t\"G\n\x12\x45xplanationRequest\x12\r\n\x05query\x18\x01 \x01(\t\x12\"\n\ttemplates\x18\x02 \x03(\x0b\x32\x0f.agent.Template\";\n\x13\x45xplanationResponse\x12\x13\n\x0b\x65xplanation\x18\x01 \x01(\t\x12\x0f\n\x07reasons\x18\x02 \x03(\t\"[\n\x0fRerankCandidate\x12\x13\n\x0btemplate_id\x18\x01 \x01(\t\x12\r\n\x05score\x18\x02 \x01(\x02\x12\x11\n\tembedding\x18\x03 \x01(\x0c\x12\x11\n\tuse_count\x18\x04 \x01(\x05\"k\n\rCandidateList\x12\x0e\n\x06source\x18\x01 \x01(\t\x12\x13\n\x06weight\x18\x02 \x01(\x02H\x00\x88\x01\x01\x12*\n\ncandidates\x18\x03 \x03(\x0b\x32\x16.agent.RerankCandidateB\t\n\x07_weight\"\xd5\x01\n\rRerankRequest\x12#\n\x05lists\x18\x01 \x03(\x0b\x32\x14.agent.CandidateList\x12\r\n\x05top_k\x18\x02 \x01(\x05\x12\x12\n\x05rrf_k\x18\x03 \x01(\x02H\x00\x88\x01\x01\x12\x14\n\x0cscore_weight\x18\x04 \x01(\x02\x12\x1e\n\x11popularity_weight\x18\x05 \x01(\x02H\x01\x88\x01\x01\x12\x17\n\nmmr_lambda\x18\x06 \x01(\x02H\x02\x88\x01\x01\x42\x08\n\x06_rrf_kB\x14\n\x12_popularity_weightB\r\n\x0b_mmr_lambda\"4\n\x0eRankedTemplate\x12\x13\n\x0btemplate_id\x18\x01 \x01(\t\x12\r\n\x05score\x18\x02 \x01(\x02\"8\n\x0eRerankResponse\x12&\n\x07results\x18\x01 \x03(\x0b\x32\x15.agent.RankedTemplate\"6\n\x0eProfileRequest\x12\x0f\n\x07seconds\x18\x01 \x01(\x05\x12\x13\n\x0binterval_ms\x18\x02 \x01(\x05\"C\n\x0fProfileResponse\x12\x0e\n\x06\x66ormat\x18\x01 \x01(\t\x12\x0f\n\x07profile\x18\x02 \x01(\t\x12\x0f\n\x07samples\x18\x03 \x01(\x05\x32\xd3\x02\n\tAIService\x12?\n\x10UnderstandIntent\x12\x14.agent.IntentRequest\x1a\x15.agent.IntentResponse\x12\x46\n\x11GenerateEmbedding\x12\x17.agent.EmbeddingRequest\x1a\x18.agent.EmbeddingResponse\x12L\n\x13GenerateExplanation\x12\x19.agent.ExplanationRequest\x1a\x1a.agent.ExplanationResponse\x12\x35\n\x06Rerank\x12\x14.agent.RerankRequest\x1a\x15.agent.RerankResponse\x12\x38\n\x07Profile\x12\x15.agent.ProfileRequest\x1a\x16.agent.ProfileResponseB\x1aZ\x18template-recommend/protob\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -35,21 +35,35 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_INTENTRESPONSE_FEATURESENTRY']._loaded_options = None
   _globals['_INTENTRESPONSE_FEATURESENTRY']._serialized_options = b'8\001'
   _globals['_INTENTREQUEST']._serialized_start=28
-  _globals['_INTENTREQUEST']._serialized_end=92
-  _globals['_INTENTRESPONSE']._serialized_start=95
-  _globals['_INTENTRESPONSE']._serialized_end=288
-  _globals['_INTENTRESPONSE_FEATURESENTRY']._serialized_start=241
-  _globals['_INTENTRESPONSE_FEATURESENTRY']._serialized_end=288
-  _globals['_EMBEDDINGREQUEST']._serialized_start=290
-  _globals['_EMBEDDINGREQUEST']._serialized_end=322
-  _globals['_EMBEDDINGRESPONSE']._serialized_start=324
-  _globals['_EMBEDDINGRESPONSE']._serialized_end=381
-  _globals['_TEMPLATE']._serialized_start=383
-  _globals['_TEMPLATE']._serialized_end=463
-  _globals['_EXPLANATIONREQUEST']._serialized_start=465
-  _globals['_EXPLANATIONREQUEST']._serialized_end=536
-  _globals['_EXPLANATIONRESPONSE']._serialized_start=538
-  _globals['_EXPLANATIONRESPONSE']._serialized_end=597
-  _globals['_AISERVICE']._serialized_start=600
-  _globals['_AISERVICE']._serialized_end=826
+  _globals['_INTENTREQUEST']._serialized_end=112
+  _globals['_INTENTRESPONSE']._serialized_start=115
+  _globals['_INTENTRESPONSE']._serialized_end=308
+  _globals['_INTENTRESPONSE_FEATURESENTRY']._serialized_start=261
+  _globals['_INTENTRESPONSE_FEATURESENTRY']._serialized_end=308
+  _globals['_EMBEDDINGREQUEST']._serialized_start=310
+  _globals['_EMBEDDINGREQUEST']._serialized_end=342
+  _globals['_EMBEDDINGRESPONSE']._serialized_start=344
+  _globals['_EMBEDDINGRESPONSE']._serialized_end=401
+  _globals['_TEMPLATE']._serialized_start=403
+  _globals['_TEMPLATE']._serialized_end=483
+  _globals['_EXPLANATIONREQUEST']._serialized_start=485
+  _globals['_EXPLANATIONREQUEST']._serialized_end=556
+  _globals['_EXPLANATIONRESPONSE']._serialized_start=558
+  _globals['_EXPLANATIONRESPONSE']._serialized_end=617
+  _globals['_RERANKCANDIDATE']._serialized_start=619
+  _globals['_RERANKCANDIDATE']._serialized_end=710
+  _globals['_CANDIDATELIST']._serialized_start=712
+  _globals['_CANDIDATELIST']._serialized_end=819
+  _globals['_RERANKREQUEST']._serialized_start=822
+  _globals['_RERANKREQUEST']._serialized_end=1035
+  _globals['_RANKEDTEMPLATE']._serialized_start=1037
+  _globals['_RANKEDTEMPLATE']._serialized_end=1089
+  _globals['_RERANKRESPONSE']._serialized_start=1091
+  _globals['_RERANKRESPONSE']._serialized_end=1147
+  _globals['_PROFILEREQUEST']._serialized_start=1149
+  _globals['_PROFILEREQUEST']._serialized_end=1203
+  _globals['_PROFILERESPONSE']._serialized_start=1205
+  _globals['_PROFILERESPONSE']._serialized_end=1272
+  _globals['_AISERVICE']._serialized_start=1275
+  _globals['_AISERVICE']._serialized_end=1614
 # @@protoc_insertion_point(module_scope)
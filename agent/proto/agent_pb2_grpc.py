@@ -49,6 +49,16 @@ class AIServiceStub(object):
                 request_serializer=proto_dot_agent__pb2.ExplanationRequest.SerializeToString,
                 response_deserializer=proto_dot_agent__pb2.ExplanationResponse.FromString,
                 _registered_method=True)
+        self.Rerank = channel.unary_unary(
+                '/agent.AIService/Rerank',
+                request_serializer=proto_dot_agent__pb2.RerankRequest.SerializeToString,
+                response_deserializer=proto_dot_agent__pb2.RerankResponse.FromString,
+                _registered_method=True)
+        self.Profile = channel.unary_unary(
+                '/agent.AIService/Profile',
+                request_serializer=proto_dot_agent__pb2.ProfileRequest.SerializeToString,
+                response_deserializer=proto_dot_agent__pb2.ProfileResponse.FromString,
+                _registered_method=True)
 
 
 class AIServiceServicer(object):
@@ -75,6 +85,20 @@ class AIServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def Rerank(self, request, context):
+        """Fuse candidate lists with weighted RRF and diversify them with MMR
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Profile(self, request, context):
+        """Admin: sample the live process and return a flamegraph-ready profile
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_AIServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -93,6 +117,16 @@ def add_AIServiceServicer_to_server(servicer, server):
                     request_deserializer=proto_dot_agent__pb2.ExplanationRequest.FromString,
                     response_serializer=proto_dot_agent__pb2.ExplanationResponse.SerializeToString,
             ),
+            'Rerank': grpc.unary_unary_rpc_method_handler(
+                    servicer.Rerank,
+                    request_deserializer=proto_dot_agent__pb2.RerankRequest.FromString,
+                    response_serializer=proto_dot_agent__pb2.RerankResponse.SerializeToString,
+            ),
+            'Profile': grpc.unary_unary_rpc_method_handler(
+                    servicer.Profile,
+                    request_deserializer=proto_dot_agent__pb2.ProfileRequest.FromString,
+                    response_serializer=proto_dot_agent__pb2.ProfileResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'agent.AIService', rpc_method_handlers)
@@ -184,3 +218,57 @@ class AIService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def Rerank(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/agent.AIService/Rerank',
+            proto_dot_agent__pb2.RerankRequest.SerializeToString,
+            proto_dot_agent__pb2.RerankResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Profile(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/agent.AIService/Profile',
+            proto_dot_agent__pb2.ProfileRequest.SerializeToString,
+            proto_dot_agent__pb2.ProfileResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
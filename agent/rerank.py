@@ -0,0 +1,183 @@
+import numpy as np
+from typing import Dict, List, Optional
+
+
+# Default per-source weights of the Go fusion service, renormalized over the non-empty lists
+DEFAULT_SOURCE_WEIGHTS = {"vector": 0.5, "tag": 0.3, "keyword": 0.2}
+DEFAULT_RRF_K = 60.0
+DEFAULT_POPULARITY_WEIGHT = 0.1
+DEFAULT_MMR_LAMBDA = 0.7
+# MMR only considers this many candidates per requested result
+MMR_POOL_FACTOR = 5
+
+
+class RerankService:
+    """Weighted RRF fusion, score blending and MMR diversification in NumPy.
+
+    All candidate lists are scattered into dense (lists x candidates) matrices
+    so fusion is a single matrix-vector product; MMR works on the cosine
+    similarity matrix of a small pool of the most relevant candidates.
+    """
+
+    def rerank(
+        self,
+        lists: List[Dict],
+        top_k: int,
+        rrf_k: float = DEFAULT_RRF_K,
+        score_weight: float = 0.0,
+        popularity_weight: float = DEFAULT_POPULARITY_WEIGHT,
+        mmr_lambda: float = DEFAULT_MMR_LAMBDA,
+    ) -> List[Dict]:
+        """Rerank candidates and return the top-K in selection order.
+
+        Each list is {"source", "weight" (optional), "candidates"} with candidates
+        ordered by rank; a candidate is {"template_id", "score", "embedding", "use_count"}
+        where the embedding is packed little-endian float32 bytes.
+        """
+        self._validate(top_k, rrf_k, score_weight, popularity_weight, mmr_lambda)
+        lists = [l for l in lists if l["candidates"]]
+        if not lists:
+            return []
+        weights = self._list_weights(lists)
+
+        # Flatten all lists and give every distinct template a column in order of first appearance
+        flat = [c for l in lists for c in l["candidates"]]
+        sizes = [len(l["candidates"]) for l in lists]
+        index: Dict[str, int] = {}
+        candidate_cols = np.fromiter(
+            (index.setdefault(c["template_id"], len(index)) for c in flat), dtype=np.intp, count=len(flat)
+        )
+        ids = list(index)
+
+        rows = np.repeat(np.arange(len(lists)), sizes)
+        cols = candidate_cols
+        ranks = np.concatenate([np.arange(1, size + 1) for size in sizes]).astype(np.float64)
+        raw_scores = np.array([c.get("score", 0.0) for c in flat], dtype=np.float64)
+        if not np.isfinite(raw_scores).all():
+            raise ValueError("candidate scores must be finite")
+        use_counts = np.array([c.get("use_count", 0) for c in flat], dtype=np.float64)
+
+        # A template listed twice in one list keeps its first (best) rank
+        n_lists, n = len(lists), len(ids)
+        _, keep = np.unique(rows * n + cols, return_index=True)
+        rows, cols, ranks, raw_scores = rows[keep], cols[keep], ranks[keep], raw_scores[keep]
+
+        # Weighted RRF, normalized so a rank-1 hit in every list scores 1.0
+        rrf = np.zeros((n_lists, n))
+        rrf[rows, cols] = 1.0 / (rrf_k + ranks)
+        relevance = weights @ rrf * (rrf_k + 1.0)
+
+        # Blend in min-max normalized source scores
+        if score_weight > 0:
+            scores = np.zeros((n_lists, n))
+            scores[rows, cols] = raw_scores
+            present = np.zeros((n_lists, n), dtype=bool)
+            present[rows, cols] = True
+            lo = np.where(present, scores, np.inf).min(axis=1, keepdims=True)
+            hi = np.where(present, scores, -np.inf).max(axis=1, keepdims=True)
+            span = np.where(hi > lo, hi - lo, 1.0)
+            normalized = np.where(present, (scores - lo) / span, 0.0)
+            relevance = (1.0 - score_weight) * relevance + score_weight * (weights @ normalized)
+
+        # Popularity boost of at most popularity_weight, reached at use_count 1000. Unlike the Go
+        # fusion service (absolute boost up to 0.1 on raw RRF scores of ~0.016), it is on the same
+        # normalized scale as relevance: the default 0.1 is a tenth of a perfect RRF score.
+        if popularity_weight > 0:
+            popularity = np.zeros(n)
+            np.maximum.at(popularity, candidate_cols, use_counts)
+            relevance = relevance + popularity_weight * np.minimum(popularity / 1000.0, 1.0)
+
+        order = self._mmr(relevance, flat, candidate_cols, min(top_k, n), mmr_lambda)
+
+        return [{"template_id": ids[i], "score": float(relevance[i])} for i in order]
+
+    def _validate(self, top_k: int, rrf_k: float, score_weight: float, popularity_weight: float,
+                  mmr_lambda: float):
+        """Reject parameters outside their meaningful range"""
+        if top_k <= 0:
+            raise ValueError(f"top_k must be positive, got {top_k}")
+        if not 0 < rrf_k < np.inf:
+            raise ValueError(f"rrf_k must be positive and finite, got {rrf_k}")
+        if not 0.0 <= score_weight <= 1.0:
+            raise ValueError(f"score_weight must be in [0, 1], got {score_weight}")
+        if not 0 <= popularity_weight < np.inf:
+            raise ValueError(f"popularity_weight must be non-negative and finite, got {popularity_weight}")
+        if not 0.0 <= mmr_lambda <= 1.0:
+            raise ValueError(f"mmr_lambda must be in [0, 1], got {mmr_lambda}")
+
+    def _list_weights(self, lists: List[Dict]) -> np.ndarray:
+        """Per-list weights, normalized over the non-empty lists"""
+        weights = np.array([
+            l["weight"] if l.get("weight") is not None
+            else DEFAULT_SOURCE_WEIGHTS.get(l["source"], 1.0 / len(lists))
+            for l in lists
+        ], dtype=np.float64)
+        if not (np.isfinite(weights).all() and (weights >= 0).all()):
+            raise ValueError("list weights must be non-negative and finite")
+        total = weights.sum()
+        return weights / total if total > 0 else np.full(len(lists), 1.0 / len(lists))
+
+    def _pool_similarity(self, pool: np.ndarray, flat: List[Dict], candidate_cols: np.ndarray) -> Optional[np.ndarray]:
+        """Cosine similarity between pooled candidates; those without embeddings are orthogonal to all.
+        
+        Only candidates of pooled templates are inspected, and the first non-empty
+        embedding of a template wins. Returns None when no pooled template has one.
+        """
+        positions = np.full(candidate_cols.max() + 1, -1, dtype=np.intp)
+        positions[pool] = np.arange(len(pool))
+        slot = positions[candidate_cols]
+
+        found: Dict[int, bytes] = {}
+        for i in np.flatnonzero(slot >= 0).tolist():
+            embedding = flat[i].get("embedding")
+            if embedding and slot[i] not in found:
+                found[int(slot[i])] = embedding
+        if not found:
+            return None
+
+        sizes = {len(e) for e in found.values()}
+        if len(sizes) != 1 or next(iter(sizes)) % 4 != 0:
+            raise ValueError("candidate embeddings must all be float32 vectors of the same dimension")
+
+        rows = np.fromiter(found.keys(), dtype=np.intp, count=len(found))
+        vectors = np.frombuffer(b"".join(found.values()), dtype="<f4").reshape(len(rows), -1)
+        norms = np.linalg.norm(vectors, axis=1)
+        vectors = vectors / np.where(norms > 0, norms, 1.0)[:, None]
+
+        similarity = np.zeros((len(pool), len(pool)))
+        similarity[np.ix_(rows, rows)] = vectors @ vectors.T
+        return similarity
+
+    def _mmr(self, relevance: np.ndarray, flat: List[Dict], candidate_cols: np.ndarray,
+             top_k: int, mmr_lambda: float) -> List[int]:
+        """Greedy maximal marginal relevance selection.
+        
+        Only the most relevant MMR_POOL_FACTOR * top_k candidates compete; their
+        pairwise similarities come from a single small Gram matrix.
+        """
+        ranked = np.argsort(-relevance, kind="stable")
+        if mmr_lambda >= 1.0:
+            return ranked[:top_k].tolist()
+
+        pool = ranked[:top_k * MMR_POOL_FACTOR]
+        similarity = self._pool_similarity(pool, flat, candidate_cols)
+        if similarity is None:
+            return ranked[:top_k].tolist()
+
+        # Put relevance on the same [0, 1] scale as cosine similarity
+        pool_relevance = relevance[pool]
+        peak = pool_relevance.max()
+        if peak > 0:
+            pool_relevance = pool_relevance / peak
+
+        selected: List[int] = []
+        max_similarity = np.zeros(len(pool))
+        available = np.ones(len(pool), dtype=bool)
+        for _ in range(top_k):
+            mmr = mmr_lambda * pool_relevance - (1.0 - mmr_lambda) * max_similarity
+            mmr[~available] = -np.inf
+            best = int(np.argmax(mmr))
+            selected.append(int(pool[best]))
+            available[best] = False
+            np.maximum(max_similarity, similarity[best], out=max_similarity)
+        return selected
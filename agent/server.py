@@ -6,7 +6,11 @@ from proto import agent_pb2
 from proto import agent_pb2_grpc
 from agent import TemplateAgent
 from embedding import EmbeddingService
+from rerank import RerankService, DEFAULT_RRF_K, DEFAULT_POPULARITY_WEIGHT, DEFAULT_MMR_LAMBDA
 from config import config
+from warmup import load_snapshot
+from tracing import TracingInterceptor, init_tracing
+from profiling import SamplingProfiler
 
 logging.basicConfig(
     level=logging.INFO,
@@ -20,10 +24,23 @@ class AIServicer(agent_pb2_grpc.AIServiceServicer):
     
     def __init__(self):
         logger.info("Initializing AI Service...")
-        self.agent = TemplateAgent()
         self.embedding_service = EmbeddingService()
+        self.agent = TemplateAgent(self.embedding_service)
+        self.rerank_service = RerankService()
+        self.profiler = SamplingProfiler()
+        if config.warmup_source:
+            self._load_warmup_snapshot()
         logger.info("AI Service initialized successfully")
     
+    def _load_warmup_snapshot(self):
+        """Pre-fill caches from the off-peak warm-up job"""
+        try:
+            loaded = load_snapshot(config.warmup_source, self.agent, self.embedding_service)
+            logger.info(f"Loaded {loaded} cache entries from warm-up snapshot ({config.warmup_source})")
+        except Exception as e:
+            # A missing or stale snapshot only means a cold start
+            logger.warning(f"Failed to load warm-up snapshot: {e}")
+    
     def UnderstandIntent(self, request, context):
         """Understand user intent and extract features"""
         try:
@@ -33,7 +50,8 @@ class AIServicer(agent_pb2_grpc.AIServiceServicer):
             intent_result = self.agent.understand_intent(
                 query=request.query,
                 user_id=request.user_id,
-                context=list(request.context)
+                context=list(request.context),
+                session_id=request.session_id
             )
             
             logger.info(f"Intent understood: {intent_result['intent']}")
@@ -104,13 +122,86 @@ class AIServicer(agent_pb2_grpc.AIServiceServicer):
             context.set_code(grpc.StatusCode.INTERNAL)
             context.set_details(str(e))
             return agent_pb2.ExplanationResponse()
+    
+    def Rerank(self, request, context):
+        """Fuse and diversify candidate lists"""
+        try:
+            lists = [
+                {
+                    'source': l.source,
+                    'weight': l.weight if l.HasField('weight') else None,
+                    'candidates': [
+                        {
+                            'template_id': c.template_id,
+                            'score': c.score,
+                            'embedding': c.embedding,
+                            'use_count': c.use_count
+                        }
+                        for c in l.candidates
+                    ]
+                }
+                for l in request.lists
+            ]
+            
+            results = self.rerank_service.rerank(
+                lists,
+                top_k=request.top_k,
+                rrf_k=request.rrf_k if request.HasField('rrf_k') else DEFAULT_RRF_K,
+                score_weight=request.score_weight,
+                popularity_weight=(request.popularity_weight if request.HasField('popularity_weight')
+                                   else DEFAULT_POPULARITY_WEIGHT),
+                mmr_lambda=request.mmr_lambda if request.HasField('mmr_lambda') else DEFAULT_MMR_LAMBDA
+            )
+            
+            logger.debug(f"Reranked {sum(len(l['candidates']) for l in lists)} candidates into {len(results)}")
+            
+            return agent_pb2.RerankResponse(
+                results=[agent_pb2.RankedTemplate(**r) for r in results]
+            )
+        except ValueError as e:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(str(e))
+            return agent_pb2.RerankResponse()
+        except Exception as e:
+            logger.error(f"Rerank failed: {e}", exc_info=True)
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(str(e))
+            return agent_pb2.RerankResponse()
+
+    
+    def Profile(self, request, context):
+        """Sample all threads of the running process"""
+        if not config.profiling_enabled:
+            context.set_code(grpc.StatusCode.PERMISSION_DENIED)
+            context.set_details("profiling is disabled (PROFILING_ENABLED=false)")
+            return agent_pb2.ProfileResponse()
+        
+        seconds = min(max(request.seconds, 1), config.profiling_max_seconds)
+        # Sampling faster than every 5ms walks every thread stack too often on the live process
+        interval = min(max(request.interval_ms or 10, 5), 1000) / 1000.0
+        try:
+            logger.info(f"Profiling for {seconds}s at {interval * 1000:.0f}ms interval")
+            folded, samples = self.profiler.profile(seconds, interval)
+            return agent_pb2.ProfileResponse(format="folded", profile=folded, samples=samples)
+        except RuntimeError as e:
+            context.set_code(grpc.StatusCode.RESOURCE_EXHAUSTED)
+            context.set_details(str(e))
+            return agent_pb2.ProfileResponse()
+        except Exception as e:
+            logger.error(f"Profiling failed: {e}", exc_info=True)
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(str(e))
+            return agent_pb2.ProfileResponse()
 
 
 def serve():
     """Start the gRPC server"""
+    init_tracing()
+    
     # TODO: Configure server parameters
     server = grpc.server(
         futures.ThreadPoolExecutor(max_workers=10),
+        interceptors=[TracingInterceptor()],
         options=[
             ('grpc.max_send_message_length', 10 * 1024 * 1024),
             ('grpc.max_receive_message_length', 10 * 1024 * 1024),
@@ -0,0 +1,266 @@
+import base64
+import json
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+
+from config import config
+
+
+class TTLMemorySaver(InMemorySaver):
+    """In-process checkpoint saver that forgets idle sessions after a TTL.
+
+    Like RedisSaver, only the latest checkpoint of each session is kept.
+    """
+
+    def __init__(self, ttl_seconds: int = 1800, sweep_interval: int = 60):
+        super().__init__()
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+        self._last_seen: Dict[str, float] = {}
+        # Blob keys referenced by the latest checkpoint of each (thread, namespace)
+        self._live_blobs: Dict[Tuple[str, str], set] = {}
+        self._last_sweep = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _touch(self, thread_id: str):
+        """Mark a session as active and evict expired ones periodically"""
+        now = time.monotonic()
+        with self._lock:
+            self._last_seen[thread_id] = now
+            if now - self._last_sweep < self.sweep_interval:
+                return
+            self._last_sweep = now
+            expired = [
+                tid for tid, seen in self._last_seen.items()
+                if now - seen > self.ttl_seconds
+            ]
+            for tid in expired:
+                del self._last_seen[tid]
+                self.delete_thread(tid)
+
+    def _is_expired(self, thread_id: str) -> bool:
+        seen = self._last_seen.get(thread_id)
+        return seen is not None and time.monotonic() - seen > self.ttl_seconds
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        if self._is_expired(thread_id):
+            with self._lock:
+                self._last_seen.pop(thread_id, None)
+                self.delete_thread(thread_id)
+            return None
+        return super().get_tuple(config)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        self._touch(thread_id)
+        saved = super().put(config, checkpoint, metadata, new_versions)
+
+        # Drop older checkpoints, their pending writes and blobs no longer referenced
+        with self._lock:
+            checkpoints = self.storage[thread_id][checkpoint_ns]
+            for checkpoint_id in [c for c in checkpoints if c != checkpoint["id"]]:
+                del checkpoints[checkpoint_id]
+                self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+
+            live = {(thread_id, checkpoint_ns, k, v) for k, v in checkpoint["channel_versions"].items()}
+            written = {(thread_id, checkpoint_ns, k, v) for k, v in new_versions.items()}
+            stale = (self._live_blobs.get((thread_id, checkpoint_ns), set()) | written) - live
+            for key in stale:
+                self.blobs.pop(key, None)
+            self._live_blobs[(thread_id, checkpoint_ns)] = live
+        return saved
+
+    def delete_thread(self, thread_id: str) -> None:
+        for key in [k for k in self._live_blobs if k[0] == thread_id]:
+            del self._live_blobs[key]
+        super().delete_thread(thread_id)
+
+
+class RedisSaver(BaseCheckpointSaver):
+    """Checkpoint saver backed by Redis, shared across agent replicas.
+
+    Only the latest checkpoint of each session is kept; every key expires
+    after the TTL so abandoned sessions clean themselves up.
+    """
+
+    def __init__(self, client, ttl_seconds: int = 1800, prefix: str = "agent:session"):
+        super().__init__()
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def _checkpoint_key(self, thread_id: str, checkpoint_ns: str) -> str:
+        return f"{self.prefix}:{thread_id}:{checkpoint_ns}"
+
+    def _writes_key(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> str:
+        return f"{self.prefix}:{thread_id}:{checkpoint_ns}:writes:{checkpoint_id}"
+
+    def _dumps(self, value: Any) -> str:
+        type_, data = self.serde.dumps_typed(value)
+        return json.dumps([type_, base64.b64encode(data).decode("ascii")])
+
+    def _loads(self, raw: bytes) -> Any:
+        type_, data = json.loads(raw)
+        return self.serde.loads_typed((type_, base64.b64decode(data)))
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+
+        saved = self.client.hgetall(self._checkpoint_key(thread_id, checkpoint_ns))
+        if not saved:
+            return None
+
+        checkpoint_id = saved[b"id"].decode()
+        requested_id = get_checkpoint_id(config)
+        if requested_id and requested_id != checkpoint_id:
+            # Older checkpoints are not retained
+            return None
+
+        writes = self.client.hgetall(self._writes_key(thread_id, checkpoint_ns, checkpoint_id))
+        pending_writes = []
+        for raw in writes.values():
+            task_id, channel, value, _ = self._loads(raw)
+            pending_writes.append((task_id, channel, value))
+
+        parent_id = saved.get(b"parent", b"").decode()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self._loads(saved[b"checkpoint"]),
+            metadata=self._loads(saved[b"metadata"]),
+            pending_writes=pending_writes,
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+        )
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        if config is None or limit == 0:
+            return
+        saved = self.get_tuple(config)
+        if saved is None:
+            return
+        if before and get_checkpoint_id(before) <= saved.config["configurable"]["checkpoint_id"]:
+            return
+        if filter and not all(saved.metadata.get(k) == v for k, v in filter.items()):
+            return
+        yield saved
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        key = self._checkpoint_key(thread_id, checkpoint_ns)
+
+        pipe = self.client.pipeline()
+        parent_id = config["configurable"].get("checkpoint_id")
+        if parent_id:
+            # Pending writes of the replaced checkpoint are no longer reachable
+            pipe.delete(self._writes_key(thread_id, checkpoint_ns, parent_id))
+        pipe.hset(key, mapping={
+            "id": checkpoint["id"],
+            "parent": parent_id or "",
+            "checkpoint": self._dumps(checkpoint),
+            "metadata": self._dumps(metadata),
+        })
+        pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        key = self._writes_key(thread_id, checkpoint_ns, checkpoint_id)
+
+        pipe = self.client.pipeline()
+        for idx, (channel, value) in enumerate(writes):
+            field = f"{task_id}:{WRITES_IDX_MAP.get(channel, idx)}"
+            payload = self._dumps((task_id, channel, value, task_path))
+            if WRITES_IDX_MAP.get(channel, idx) >= 0:
+                pipe.hsetnx(key, field, payload)
+            else:
+                pipe.hset(key, field, payload)
+        pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
+
+    def delete_thread(self, thread_id: str) -> None:
+        keys = list(self.client.scan_iter(match=f"{self.prefix}:{thread_id}:*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+def create_checkpointer() -> Optional[BaseCheckpointSaver]:
+    """Create the session checkpointer configured by SESSION_BACKEND"""
+    if config.session_backend == "redis":
+        import redis
+        client = redis.Redis(
+            host=config.redis_host,
+            port=config.redis_port,
+            db=config.redis_db,
+            password=config.redis_password or None,
+        )
+        return RedisSaver(client, ttl_seconds=config.session_ttl_seconds)
+    elif config.session_backend == "memory":
+        return TTLMemorySaver(ttl_seconds=config.session_ttl_seconds)
+    return None
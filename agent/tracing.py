@@ -0,0 +1,94 @@
+import functools
+import logging
+from contextlib import contextmanager
+
+import grpc
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+try:
+    from opentelemetry import propagate, trace
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+except ImportError:  # tracing is optional
+    trace = None
+
+_tracer = None
+
+
+def init_tracing():
+    """Configure the OpenTelemetry SDK and OTLP exporter when tracing is enabled"""
+    global _tracer
+    if trace is None or not config.tracing_enabled:
+        return
+
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+    except ImportError as e:
+        logger.warning(f"Tracing enabled but OpenTelemetry SDK is unavailable: {e}")
+        return
+
+    # Endpoint and headers come from the standard OTEL_EXPORTER_OTLP_* variables
+    provider = TracerProvider(resource=Resource.create({"service.name": config.tracing_service_name}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("agent")
+    logger.info("OpenTelemetry tracing enabled")
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Start a child span of the current trace; a no-op when tracing is off"""
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+def traced(name: str):
+    """Decorator wrapping a function call in a span"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TracingInterceptor(grpc.ServerInterceptor):
+    """Opens a server span per RPC, continuing the caller's trace from gRPC metadata"""
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if _tracer is None or handler is None or handler.unary_unary is None:
+            return handler
+
+        method = handler_call_details.method
+        carrier = {k: v for k, v in (handler_call_details.invocation_metadata or ())}
+        behavior = handler.unary_unary
+
+        def traced_behavior(request, context):
+            parent = propagate.extract(carrier)
+            with _tracer.start_as_current_span(
+                method.lstrip("/"),
+                context=parent,
+                kind=SpanKind.SERVER,
+                attributes={"rpc.system": "grpc", "rpc.method": method},
+            ) as current:
+                response = behavior(request, context)
+                code = context.code() if hasattr(context, "code") else None
+                if code not in (None, grpc.StatusCode.OK):
+                    current.set_status(Status(StatusCode.ERROR, str(code)))
+                return response
+
+        return grpc.unary_unary_rpc_method_handler(
+            traced_behavior,
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer,
+        )
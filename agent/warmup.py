@@ -0,0 +1,215 @@
+"""Cache warm-up job.
+
+Mines recent rows of ``user_interactions`` for the most frequent and the
+slowest normalized queries, precomputes their intents, embeddings and
+explanations, and stores a snapshot that the agent loads into its caches at
+startup. Intended to run off-peak, e.g.::
+
+    python warmup.py --days 7 --top 200 --slowest 50
+"""
+import argparse
+import json
+import logging
+import time
+from concurrent import futures
+from typing import Dict, List
+
+from cache import normalize_query
+from config import config
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = "agent:warmup:snapshot"
+SNAPSHOT_TTL_SECONDS = 7 * 24 * 3600
+
+CANDIDATES_SQL = """
+SELECT lower(btrim(query)) AS query,
+       COUNT(*) AS hits,
+       AVG(response_time_ms) AS avg_ms,
+       (ARRAY_AGG(recommended_templates ORDER BY created_at DESC))[1] AS template_ids
+FROM user_interactions
+WHERE created_at > NOW() - make_interval(days => %s)
+  AND (session_id IS NULL OR session_id = '')
+GROUP BY lower(btrim(query))
+"""
+
+TEMPLATES_SQL = """
+SELECT template_id, name, description, tags
+FROM templates
+WHERE template_id = ANY(%s)
+"""
+
+
+def connect_db():
+    import psycopg2
+    return psycopg2.connect(
+        host=config.db_host,
+        port=config.db_port,
+        user=config.db_user,
+        password=config.db_password,
+        dbname=config.db_name,
+    )
+
+
+def _redis_client():
+    import redis
+    return redis.Redis(
+        host=config.redis_host,
+        port=config.redis_port,
+        db=config.redis_db,
+        password=config.redis_password or None,
+    )
+
+
+def fetch_candidates(conn, days: int, top: int, slowest: int) -> List[Dict]:
+    """Select the most frequent and the slowest normalized queries"""
+    with conn.cursor() as cur:
+        cur.execute(CANDIDATES_SQL, (days,))
+        rows = cur.fetchall()
+
+    # SQL groups by lower/trim only; merge the remaining spelling variants here
+    grouped: Dict[str, Dict] = {}
+    for query, hits, avg_ms, template_ids in rows:
+        key = normalize_query(query)
+        if not key:
+            continue
+        entry = grouped.setdefault(key, {"query": key, "hits": 0, "total_ms": 0.0, "template_ids": [], "_best": 0})
+        entry["hits"] += hits
+        entry["total_ms"] += float(avg_ms or 0) * hits
+        if hits > entry["_best"]:
+            entry["_best"] = hits
+            entry["template_ids"] = template_ids or []
+
+    for entry in grouped.values():
+        entry["avg_ms"] = entry.pop("total_ms") / entry["hits"]
+        entry.pop("_best")
+
+    by_hits = sorted(grouped.values(), key=lambda e: e["hits"], reverse=True)[:top]
+    chosen = {e["query"] for e in by_hits}
+    by_latency = [
+        e for e in sorted(grouped.values(), key=lambda e: e["avg_ms"], reverse=True)
+        if e["query"] not in chosen
+    ][:slowest]
+    return by_hits + by_latency
+
+
+def fetch_templates(conn, template_ids: List[str]) -> Dict[str, Dict]:
+    """Load template details needed for explanations"""
+    if not template_ids:
+        return {}
+    with conn.cursor() as cur:
+        cur.execute(TEMPLATES_SQL, (list(template_ids),))
+        return {
+            row[0]: {"template_id": row[0], "name": row[1], "description": row[2] or "", "tags": list(row[3] or [])}
+            for row in cur.fetchall()
+        }
+
+
+def build_snapshot(agent, embedding_service, candidates: List[Dict],
+                   templates: Dict[str, Dict], workers: int = 4) -> Dict:
+    """Precompute intents, embeddings and explanations for the candidates"""
+    queries = [c["query"] for c in candidates]
+
+    def warm_query(candidate: Dict):
+        query = candidate["query"]
+        agent.understand_intent(query)
+        intent = agent.intent_cache.get(query)
+
+        explanation = None
+        selected = [templates[t] for t in candidate["template_ids"] if t in templates]
+        if selected:
+            agent.generate_explanation(query, selected)
+            key = (query, tuple(t["template_id"] for t in selected))
+            text = agent.explanation_cache.get(key)
+            if text is not None:
+                explanation = {"query": query, "template_ids": list(key[1]), "explanation": text}
+        return query, intent, explanation
+
+    snapshot = {"generated_at": int(time.time()), "intents": {}, "embeddings": {}, "explanations": []}
+
+    # LLM calls are network bound; run them concurrently
+    with futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        for query, intent, explanation in pool.map(warm_query, candidates):
+            if intent is not None:
+                snapshot["intents"][query] = intent
+            if explanation is not None:
+                snapshot["explanations"].append(explanation)
+
+    # Embeddings are encoded in batches
+    for query, embedding in zip(queries, embedding_service.batch_encode(queries)):
+        if embedding.any():
+            snapshot["embeddings"][query] = embedding.tolist()
+
+    return snapshot
+
+
+def save_snapshot(snapshot: Dict, output: str):
+    """Write the snapshot to Redis ("redis") or to a JSON file"""
+    data = json.dumps(snapshot, ensure_ascii=False)
+    if output == "redis":
+        _redis_client().set(SNAPSHOT_KEY, data, ex=SNAPSHOT_TTL_SECONDS)
+    else:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(data)
+
+
+def load_snapshot(source: str, agent, embedding_service) -> int:
+    """Fill the agent caches from a snapshot; returns the number of entries loaded"""
+    import numpy as np
+
+    if source == "redis":
+        data = _redis_client().get(SNAPSHOT_KEY)
+        if data is None:
+            return 0
+        snapshot = json.loads(data)
+    else:
+        with open(source, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+
+    for query, intent in snapshot.get("intents", {}).items():
+        agent.intent_cache.set(query, intent)
+    for query, embedding in snapshot.get("embeddings", {}).items():
+        embedding_service.cache.set(query, np.array(embedding))
+    for item in snapshot.get("explanations", []):
+        agent.explanation_cache.set((item["query"], tuple(item["template_ids"])), item["explanation"])
+
+    return len(snapshot.get("intents", {})) + len(snapshot.get("embeddings", {})) + len(snapshot.get("explanations", []))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute agent caches from user_interactions")
+    parser.add_argument("--days", type=int, default=7, help="look-back window in days")
+    parser.add_argument("--top", type=int, default=200, help="number of most frequent queries")
+    parser.add_argument("--slowest", type=int, default=50, help="number of slowest queries")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent LLM calls")
+    parser.add_argument("--output", default="redis", help='"redis" or a JSON file path')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    from agent import TemplateAgent
+    from embedding import EmbeddingService
+
+    conn = connect_db()
+    try:
+        candidates = fetch_candidates(conn, args.days, args.top, args.slowest)
+        template_ids = {t for c in candidates for t in c["template_ids"]}
+        templates = fetch_templates(conn, sorted(template_ids))
+    finally:
+        conn.close()
+    logger.info(f"Warming {len(candidates)} queries from the last {args.days} days")
+
+    # No embedding prefetch in the agent: build_snapshot batch-encodes every query once itself
+    snapshot = build_snapshot(TemplateAgent(), EmbeddingService(), candidates, templates, args.workers)
+    save_snapshot(snapshot, args.output)
+    logger.info(
+        f"Snapshot saved to {args.output}: {len(snapshot['intents'])} intents, "
+        f"{len(snapshot['embeddings'])} embeddings, {len(snapshot['explanations'])} explanations"
+    )
+
+
+if __name__ == '__main__':
+    main()
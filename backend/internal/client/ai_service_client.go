@@ -36,10 +36,12 @@ func (c *AIServiceClient) UnderstandIntent(
 	ctx context.Context,
 	query string,
 	userID string,
+	sessionID string,
 ) (*models.Intent, error) {
 	req := &pb.IntentRequest{
-		Query:  query,
-		UserId: userID,
+		Query:     query,
+		UserId:    userID,
+		SessionId: sessionID,
 	}
 
 	resp, err := c.client.UnderstandIntent(ctx, req)
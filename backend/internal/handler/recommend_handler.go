@@ -23,9 +23,10 @@ func NewRecommendHandler(recommendSvc *service.RecommendService, cacheSvc *servi
 }
 
 type RecommendRequest struct {
-	Query  string `json:"query" binding:"required,max=500"`
-	UserID string `json:"user_id"`
-	TopK   int    `json:"top_k" binding:"min=1,max=20"`
+	Query     string `json:"query" binding:"required,max=500"`
+	UserID    string `json:"user_id"`
+	SessionID string `json:"session_id" binding:"max=64"`
+	TopK      int    `json:"top_k" binding:"min=1,max=20"`
 }
 
 type RecommendResponse struct {
@@ -52,8 +53,8 @@ func (h *RecommendHandler) Recommend(c *gin.Context) {
 
 	ctx := c.Request.Context()
 
-	// 1. Check cache
-	if h.cacheSvc != nil {
+	// 1. Check cache (session turns depend on earlier turns, so they bypass the query cache)
+	if h.cacheSvc != nil && req.SessionID == "" {
 		cached, err := h.cacheSvc.GetRecommendation(ctx, req.Query)
 		if err != nil {
 			log.Printf("[Cache] Error getting recommendation from cache: %v", err)
@@ -65,7 +66,7 @@ func (h *RecommendHandler) Recommend(c *gin.Context) {
 	}
 
 	// 2. Call recommendation service
-	result, err := h.recommendSvc.Recommend(ctx, req.Query, req.UserID, req.TopK)
+	result, err := h.recommendSvc.Recommend(ctx, req.Query, req.UserID, req.SessionID, req.TopK)
 	if err != nil {
 		c.JSON(http.StatusInternalServerError, gin.H{"error": err.Error()})
 		return
@@ -81,7 +82,7 @@ func (h *RecommendHandler) Recommend(c *gin.Context) {
 	}
 
 	// 4. Cache result asynchronously
-	if h.cacheSvc != nil {
+	if h.cacheSvc != nil && req.SessionID == "" {
 		go h.cacheSvc.CacheRecommendation(c.Copy(), req.Query, response)
 	}
 
@@ -55,12 +55,13 @@ func (s *RecommendService) Recommend(
 	ctx context.Context,
 	query string,
 	userID string,
+	sessionID string,
 	topK int,
 ) (*RecommendResult, error) {
 	startTime := time.Now()
 
 	// 1. Call Python AI service to understand intent
-	intent, err := s.aiClient.UnderstandIntent(ctx, query, userID)
+	intent, err := s.aiClient.UnderstandIntent(ctx, query, userID, sessionID)
 	if err != nil {
 		return nil, fmt.Errorf("intent understanding failed: %w", err)
 	}
@@ -132,7 +133,7 @@ func (s *RecommendService) Recommend(
 	}
 
 	// 6. Save interaction record asynchronously
-	go s.saveInteraction(context.Background(), userID, query, intent, fusedResults, time.Since(startTime))
+	go s.saveInteraction(context.Background(), userID, sessionID, query, intent, fusedResults, time.Since(startTime))
 
 	return &RecommendResult{
 		Templates:   templatesWithScore,
@@ -144,6 +145,7 @@ func (s *RecommendService) Recommend(
 func (s *RecommendService) saveInteraction(
 	ctx context.Context,
 	userID string,
+	sessionID string,
 	query string,
 	intent *models.Intent,
 	templates []models.Template,
@@ -159,6 +161,7 @@ func (s *RecommendService) saveInteraction(
 
 	interaction := &models.UserInteraction{
 		UserID:               userID,
+		SessionID:            sessionID,
 		Query:                query,
 		Intent:               string(intentJSON),
 		RecommendedTemplates: string(templatesJSON),
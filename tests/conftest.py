@@ -0,0 +1,47 @@
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+# Modules import each other flat (PYTHONPATH=/app/agent in the image)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "agent"))
+
+
+class StubLLM:
+    """Stands in for the chat model: returns a fixed intent or raises, and counts calls"""
+
+    def __init__(self, intent=None, error=None, delay=0.0):
+        self.intent = intent or {"intent": "模版推荐", "features": {}, "keywords": [], "tags": [],
+                                 "search_strategy": "hybrid"}
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return SimpleNamespace(content=json.dumps(self.intent, ensure_ascii=False))
+
+
+@pytest.fixture
+def stub_llm():
+    return StubLLM()
+
+
+@pytest.fixture
+def make_agent(monkeypatch, stub_llm):
+    """Build a TemplateAgent on the stub LLM, optionally with a given checkpointer"""
+    import agent as agent_module
+
+    monkeypatch.setattr(agent_module, "ChatOpenAI", lambda **kwargs: stub_llm)
+
+    def build(checkpointer=None, embedding_service=None):
+        monkeypatch.setattr(agent_module, "create_checkpointer", lambda: checkpointer)
+        return agent_module.TemplateAgent(embedding_service)
+
+    return build
@@ -0,0 +1,132 @@
+import threading
+import time
+
+import pytest
+
+from session import TTLMemorySaver
+
+
+LLM_INTENT = {
+    "intent": "设计邀请函",
+    "features": {"scenario": "年会"},
+    "keywords": ["年会"],
+    "tags": ["年会"],
+    "search_strategy": "hybrid",
+}
+
+
+class StubEmbeddingService:
+    """Records encoded queries; blocks until released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.encoded = []
+
+    def encode(self, text):
+        self.release.wait(5)
+        self.encoded.append(text)
+        return [0.0]
+
+
+@pytest.fixture
+def agent(make_agent):
+    return make_agent()
+
+
+def state(query, **fields):
+    return {"query": query, "context": [], **fields}
+
+
+def test_new_queries_fan_out_to_all_branches(make_agent):
+    agent = make_agent(embedding_service=StubEmbeddingService())
+    assert sorted(agent._route_branches(state("蓝色简约海报"))) == [
+        "embed_query", "extract_keywords", "match_tags", "understand_intent",
+    ]
+
+
+def test_embedding_branch_needs_a_service(agent):
+    assert "embed_query" not in agent._route_branches(state("蓝色简约海报"))
+
+
+def test_refinements_only_run_the_llm_branch(agent):
+    refinement = state("换成红色", intent="生成海报", tags=["蓝色"], keywords=["蓝色"], features={})
+    assert agent._route_branches(refinement) == ["understand_intent"]
+
+
+def test_refinement_marker_without_previous_intent_is_a_new_query(agent):
+    assert "match_tags" in agent._route_branches(state("换成红色"))
+
+
+def test_confident_dictionary_match_skips_the_llm(agent, stub_llm):
+    result = agent.understand_intent("简约商务名片设计")
+    assert stub_llm.calls == 0
+    assert result["intent"] == "制作名片"
+    assert result["features"] == {"style": "简约、商务"}
+    assert result["tags"] == ["简约", "商务", "名片"]
+    assert result["search_strategy"] == "hybrid"
+
+
+def test_unexplained_query_uses_the_llm(agent, stub_llm):
+    stub_llm.intent = LLM_INTENT
+    result = agent.understand_intent("公司年会的邀请函 要有点意思")
+    assert stub_llm.calls == 1
+    assert result["intent"] == "设计邀请函"
+    # Dictionary keywords and tags are merged into the LLM answer
+    assert "邀请函" in result["keywords"] and "邀请函" in result["tags"]
+
+
+def test_context_always_goes_to_the_llm(agent, stub_llm):
+    stub_llm.intent = LLM_INTENT
+    agent.understand_intent("简约商务名片设计", context=["我们是一家律所"])
+    assert stub_llm.calls == 1
+
+
+def test_llm_failure_falls_back_and_is_not_cached(agent, stub_llm):
+    stub_llm.error = RuntimeError("model unavailable")
+    result = agent.understand_intent("蓝色的海报 夏天清凉感")
+    assert result["intent"] == "生成海报"
+    assert result["tags"] == ["蓝色", "海报"]
+    assert result["search_strategy"] == "vector"
+    assert agent.intent_cache.get("蓝色的海报 夏天清凉感") is None
+
+
+def test_llm_deadline_falls_back(agent, stub_llm):
+    stub_llm.delay = 1.0
+    agent.llm_deadline = 0.1
+    started = time.monotonic()
+    result = agent.understand_intent("帮我找点灵感")
+    assert time.monotonic() - started < 0.8
+    assert result["intent"] == "模版推荐"
+    assert result["search_strategy"] == "vector"
+
+
+def test_embedding_prefetch_does_not_delay_the_answer(make_agent, stub_llm):
+    embedding_service = StubEmbeddingService()
+    agent = make_agent(embedding_service=embedding_service)
+    started = time.monotonic()
+    agent.understand_intent("红色海报")
+    assert time.monotonic() - started < 0.5
+    assert stub_llm.calls == 0
+
+    embedding_service.release.set()
+    agent.embedding_executor.shutdown(wait=True)
+    assert embedding_service.encoded == ["红色海报"]
+
+
+def test_embedding_prefetch_is_dropped_when_backlog_is_full(make_agent):
+    embedding_service = StubEmbeddingService()
+    agent = make_agent(embedding_service=embedding_service)
+    agent.embedding_backlog = threading.BoundedSemaphore(1)
+    assert agent._embed_query_node(state("红色海报")) == {"embedding_prefetched": True}
+    assert agent._embed_query_node(state("蓝色海报")) == {"embedding_prefetched": False}
+    embedding_service.release.set()
+
+
+def test_session_turns_reuse_branch_state_cleanly(make_agent, stub_llm):
+    agent = make_agent(TTLMemorySaver())
+    stub_llm.intent = LLM_INTENT
+    agent.understand_intent("公司年会的邀请函 要有点意思", user_id="u1", session_id="s1")
+    # A confident new query in the same session must not inherit the previous LLM answer
+    result = agent.understand_intent("简约商务名片设计", user_id="u1", session_id="s1")
+    assert result["intent"] == "制作名片"
+    assert stub_llm.calls == 1
@@ -0,0 +1,77 @@
+import pytest
+
+from session import TTLMemorySaver
+
+
+PREVIOUS = {
+    "intent": "生成海报",
+    "features": {"color": "红色、蓝色", "style": "科技"},
+    "keywords": ["科技", "红色", "蓝色", "海报"],
+    "tags": ["科技", "红色", "蓝色", "海报"],
+    "search_strategy": "vector",
+}
+
+
+@pytest.fixture
+def agent(make_agent):
+    return make_agent()
+
+
+def test_swap_replaces_the_whole_category(agent):
+    result = agent._merge_refinement(PREVIOUS, "换成绿色的")
+    assert result["tags"] == ["科技", "海报", "绿色"]
+    assert result["keywords"] == ["科技", "海报", "绿色"]
+    assert result["features"] == {"style": "科技", "color": "绿色"}
+    assert result["search_strategy"] == "hybrid"
+
+
+def test_swap_accepts_color_without_suffix(agent):
+    result = agent._merge_refinement(PREVIOUS, "改成黄的吧")
+    assert "黄色" in result["tags"]
+
+
+def test_removal_drops_only_the_term(agent):
+    result = agent._merge_refinement(PREVIOUS, "去掉蓝色")
+    assert result["tags"] == ["科技", "红色", "海报"]
+    assert result["keywords"] == ["科技", "红色", "海报"]
+    assert result["features"] == {"color": "红色", "style": "科技"}
+
+
+def test_removal_of_last_value_drops_the_feature(agent):
+    result = agent._merge_refinement(PREVIOUS, "不要科技风格")
+    assert "style" not in result["features"]
+    assert "科技" not in result["tags"]
+
+
+def test_does_not_mutate_previous(agent):
+    agent._merge_refinement(PREVIOUS, "换成绿色")
+    assert PREVIOUS["tags"] == ["科技", "红色", "蓝色", "海报"]
+
+
+@pytest.mark.parametrize("query", ["再活泼一点", "换成周末的感觉", "蓝色"])
+def test_unknown_refinements_need_the_llm(agent, query):
+    assert agent._merge_refinement(PREVIOUS, query) is None
+
+
+def test_local_refinement_skips_the_llm(make_agent, stub_llm):
+    agent = make_agent(TTLMemorySaver())
+    agent.understand_intent("科技蓝色海报", user_id="u1", session_id="s1")
+    result = agent.understand_intent("换成红色", user_id="u1", session_id="s1")
+    assert stub_llm.calls == 0
+    assert result["tags"] == ["科技", "海报", "红色"]
+
+
+def test_failed_refinement_keeps_previous_intent(make_agent, stub_llm):
+    agent = make_agent(TTLMemorySaver())
+    stub_llm.intent = dict(PREVIOUS)
+    first = agent.understand_intent("适合奶茶店的东西", user_id="u1", session_id="s1")
+
+    stub_llm.error = RuntimeError("model unavailable")
+    failed = agent.understand_intent("再活泼一点", user_id="u1", session_id="s1")
+    assert failed == first
+
+    # Later turns still build on the original intent
+    stub_llm.error = None
+    result = agent.understand_intent("去掉蓝色", user_id="u1", session_id="s1")
+    assert result["intent"] == "生成海报"
+    assert result["tags"] == ["科技", "红色", "海报"]
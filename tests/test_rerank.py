@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+from rerank import RerankService
+
+
+def vec(*values):
+    return np.asarray(values, dtype="<f4").tobytes()
+
+
+def candidate(template_id, embedding=b"", score=0.0, use_count=0):
+    return {"template_id": template_id, "score": score, "embedding": embedding, "use_count": use_count}
+
+
+def ranked_ids(results):
+    return [r["template_id"] for r in results]
+
+
+@pytest.fixture
+def service():
+    return RerankService()
+
+
+def test_fuses_lists_by_weighted_rrf(service):
+    lists = [
+        {"source": "vector", "candidates": [candidate("a"), candidate("b")]},
+        {"source": "tag", "candidates": [candidate("b"), candidate("c")]},
+    ]
+    results = service.rerank(lists, top_k=3, popularity_weight=0.0, mmr_lambda=1.0)
+    assert ranked_ids(results) == ["b", "a", "c"]
+
+
+def test_duplicate_id_keeps_best_rank(service):
+    lists = [{"source": "vector", "candidates": [candidate("a"), candidate("b"), candidate("a")]}]
+    results = service.rerank(lists, top_k=2, popularity_weight=0.0, mmr_lambda=1.0)
+    assert ranked_ids(results) == ["a", "b"]
+    assert results[0]["score"] == pytest.approx(1.0)
+
+
+def test_mmr_demotes_near_duplicates(service):
+    lists = [{"source": "vector", "candidates": [
+        candidate("a", vec(1, 0)),
+        candidate("a2", vec(1, 0.01)),
+        candidate("b", vec(0, 1)),
+    ]}]
+    results = service.rerank(lists, top_k=2, popularity_weight=0.0, mmr_lambda=0.5)
+    assert ranked_ids(results) == ["a", "b"]
+
+
+def test_partial_embeddings_are_orthogonal(service):
+    lists = [{"source": "vector", "candidates": [
+        candidate("a"), candidate("b", vec(1, 0)), candidate("c"), candidate("d", vec(1, 0)),
+    ]}]
+    results = service.rerank(lists, top_k=4, popularity_weight=0.0, mmr_lambda=0.5)
+    assert sorted(ranked_ids(results)) == ["a", "b", "c", "d"]
+
+
+def test_embeddings_outside_mmr_pool(service):
+    candidates = [candidate(f"t{i}") for i in range(10)] + [candidate("late", vec(1, 0))]
+    results = service.rerank([{"source": "vector", "candidates": candidates}], top_k=1,
+                             popularity_weight=0.0, mmr_lambda=0.5)
+    assert ranked_ids(results) == ["t0"]
+
+
+def test_mismatched_embedding_dimensions(service):
+    lists = [{"source": "vector", "candidates": [candidate("a", vec(1, 0)), candidate("b", vec(1, 0, 0))]}]
+    with pytest.raises(ValueError):
+        service.rerank(lists, top_k=2)
+
+
+@pytest.mark.parametrize("params", [
+    {"rrf_k": 0},
+    {"rrf_k": -1},
+    {"rrf_k": float("nan")},
+    {"score_weight": 1.5},
+    {"score_weight": -0.1},
+    {"mmr_lambda": 1.2},
+    {"mmr_lambda": -0.5},
+    {"popularity_weight": -1},
+    {"popularity_weight": float("inf")},
+    {"rrf_k": float("inf")},
+    {"top_k": 0},
+])
+def test_rejects_invalid_parameters(service, params):
+    lists = [{"source": "vector", "candidates": [candidate("a")]}]
+    with pytest.raises(ValueError):
+        service.rerank(lists, **{"top_k": 1, **params})
+
+
+@pytest.mark.parametrize("weight", [-1.0, float("inf"), float("nan")])
+def test_rejects_invalid_list_weight(service, weight):
+    lists = [{"source": "vector", "weight": weight, "candidates": [candidate("a")]}]
+    with pytest.raises(ValueError):
+        service.rerank(lists, top_k=1)
+
+
+def test_rejects_non_finite_scores(service):
+    lists = [{"source": "vector", "candidates": [candidate("a", score=float("inf"))]}]
+    with pytest.raises(ValueError):
+        service.rerank(lists, top_k=1, score_weight=0.5)
+
+
+def test_empty_input(service):
+    assert service.rerank([{"source": "vector", "candidates": []}], top_k=5) == []
+
+
+def test_popularity_boost_is_capped_at_the_weight(service):
+    lists = [{"source": "vector", "candidates": [candidate("a", use_count=5000), candidate("b", use_count=100)]}]
+    results = service.rerank(lists, top_k=2, popularity_weight=0.2, mmr_lambda=1.0)
+    assert results[0]["score"] == pytest.approx(1.0 + 0.2)
+    assert results[1]["score"] == pytest.approx(61 / 62 + 0.02)
@@ -0,0 +1,107 @@
+import time
+
+import fakeredis
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+
+from session import RedisSaver, TTLMemorySaver
+
+
+def thread_config(thread_id, checkpoint_id=None):
+    configurable = {"thread_id": thread_id, "checkpoint_ns": ""}
+    if checkpoint_id:
+        configurable["checkpoint_id"] = checkpoint_id
+    return {"configurable": configurable}
+
+
+def checkpoint(**values):
+    saved = empty_checkpoint()
+    saved["channel_values"] = values
+    return saved
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+
+def test_redis_saver_round_trip(redis_client):
+    saver = RedisSaver(redis_client, ttl_seconds=60)
+    first = checkpoint(intent="生成海报")
+    saved = saver.put(thread_config("t1"), first, {"source": "input", "step": 0}, {})
+    saver.put_writes(saved, [("intent", "制作名片")], task_id="task-1")
+
+    restored = saver.get_tuple(thread_config("t1"))
+    assert restored.checkpoint["id"] == first["id"]
+    assert restored.checkpoint["channel_values"] == {"intent": "生成海报"}
+    assert restored.metadata["step"] == 0
+    assert restored.pending_writes == [("task-1", "intent", "制作名片")]
+    assert restored.parent_config is None
+    assert 0 < redis_client.ttl(f"agent:session:t1:") <= 60
+
+
+def test_redis_saver_keeps_only_the_latest_checkpoint(redis_client):
+    saver = RedisSaver(redis_client, ttl_seconds=60)
+    first = checkpoint(intent="生成海报")
+    saved = saver.put(thread_config("t1"), first, {"step": 0}, {})
+    saver.put_writes(saved, [("intent", "x")], task_id="task-1")
+
+    second = checkpoint(intent="制作名片")
+    saver.put(saved, second, {"step": 1}, {})
+
+    latest = saver.get_tuple(thread_config("t1"))
+    assert latest.checkpoint["id"] == second["id"]
+    assert latest.parent_config["configurable"]["checkpoint_id"] == first["id"]
+    assert latest.pending_writes == []
+    assert saver.get_tuple(thread_config("t1", first["id"])) is None
+    assert len(list(saver.list(thread_config("t1")))) == 1
+
+
+def test_redis_saver_delete_thread(redis_client):
+    saver = RedisSaver(redis_client, ttl_seconds=60)
+    saver.put(thread_config("t1"), checkpoint(), {}, {})
+    saver.put(thread_config("t2"), checkpoint(), {}, {})
+    saver.delete_thread("t1")
+    assert saver.get_tuple(thread_config("t1")) is None
+    assert saver.get_tuple(thread_config("t2")) is not None
+
+
+def test_memory_saver_expires_idle_sessions():
+    saver = TTLMemorySaver(ttl_seconds=0.05, sweep_interval=0)
+    saver.put(thread_config("t1"), checkpoint(), {}, {})
+    assert saver.get_tuple(thread_config("t1")) is not None
+
+    time.sleep(0.1)
+    assert saver.get_tuple(thread_config("t1")) is None
+    assert "t1" not in saver.storage
+
+
+def test_memory_saver_keeps_only_the_latest_checkpoint(make_agent):
+    saver = TTLMemorySaver()
+    agent = make_agent(saver)
+    for query in ["科技蓝色海报", "换成红色", "去掉红色", "换成绿色"] * 5:
+        agent.understand_intent(query, user_id="u1", session_id="s1")
+    blobs = len(saver.blobs)
+
+    for query in ["换成红色", "换成绿色"] * 5:
+        agent.understand_intent(query, user_id="u1", session_id="s1")
+    assert sum(len(checkpoints) for checkpoints in saver.storage["u1:s1"].values()) == 1
+    assert len(saver.blobs) == blobs
+
+
+@pytest.mark.parametrize("make_saver", [TTLMemorySaver, lambda: RedisSaver(fakeredis.FakeRedis())])
+def test_sessions_are_scoped_to_the_user(make_agent, make_saver):
+    agent = make_agent(make_saver())
+    agent.understand_intent("科技蓝色海报", user_id="alice", session_id="shared")
+    result = agent.understand_intent("简约名片", user_id="bob", session_id="shared")
+    assert result["intent"] == "制作名片"
+
+    refined = agent.understand_intent("换成红色", user_id="alice", session_id="shared")
+    assert refined["tags"] == ["科技", "海报", "红色"]
+
+
+def test_redis_sessions_are_shared_across_replicas(make_agent):
+    client = fakeredis.FakeRedis()
+    make_agent(RedisSaver(client)).understand_intent("科技蓝色海报", user_id="u1", session_id="s1")
+    result = make_agent(RedisSaver(client)).understand_intent("换成红色", user_id="u1", session_id="s1")
+    assert result["tags"] == ["科技", "海报", "红色"]